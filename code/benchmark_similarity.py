@@ -0,0 +1,30 @@
+import time
+import pandas as pd
+from collaborative_filtering import CollaborativeFiltering
+from neighbor_index import NeighborIndex
+from reco_core.similarity import SIMILARITY_METRICS
+
+
+def benchmark_metrics(cf, k=15, n_jobs=1):
+    """Build time of the user and item neighbor indexes for every registered metric"""
+    cf._create_matrices()
+    rows = []
+    for metric in SIMILARITY_METRICS:
+        row = {'metric': metric}
+        for side, matrix in [('user', cf.user_item_matrix), ('item', cf.item_user_matrix)]:
+            start = time.perf_counter()
+            NeighborIndex.build(matrix, k=k, n_jobs=n_jobs, metric=metric)
+            row[f'{side}_build_s'] = time.perf_counter() - start
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    cf = CollaborativeFiltering()
+    print("Similarity build time per metric (k=15):")
+    print(benchmark_metrics(cf).to_string(index=False, float_format='{:.3f}'.format))
+
+    print("\nAccuracy per metric:")
+    for metric in SIMILARITY_METRICS:
+        for model_type in ['user', 'item']:
+            cf.evaluate(model_type=model_type, k=15, metric=metric)
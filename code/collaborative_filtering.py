@@ -1,17 +1,110 @@
-import pandas as pd
+import os
 import numpy as np
+from scipy import sparse
 from sklearn.model_selection import train_test_split
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.metrics import mean_squared_error, mean_absolute_error
+from neighbor_index import NeighborIndex
+from reco_core.dataset_cache import load_ratings
+from reco_core.id_map import IdMap
+
+
+def _row_values(matrix, row, cols):
+    """Stored values of `matrix[row, cols]` in a CSR matrix, 0 where missing"""
+    start, end = matrix.indptr[row], matrix.indptr[row + 1]
+    row_cols = matrix.indices[start:end]
+    values = np.zeros(len(cols), dtype=matrix.dtype)
+    if end > start:
+        pos = np.minimum(np.searchsorted(row_cols, cols), len(row_cols) - 1)
+        found = row_cols[pos] == cols
+        values[found] = matrix.data[start:end][pos[found]]
+    return values
+
+
+def _row_means(matrix):
+    """Mean of the stored values of every CSR row, NaN for empty rows"""
+    counts = np.diff(matrix.indptr)
+    sums = np.asarray(matrix.sum(axis=1), dtype=np.float64).ravel()
+    means = np.full(matrix.shape[0], np.nan)
+    np.divide(sums, counts, out=means, where=counts > 0)
+    return means
+
+
+def _row_sq_norms(matrix):
+    """Squared L2 norm of every CSR row, as float64 accumulators"""
+    return np.asarray(matrix.multiply(matrix).sum(axis=1), dtype=np.float64).ravel()
+
+
+def _csr_set(matrix, row, col, value):
+    """Set matrix[row, col] = value, growing the shape if needed.
+
+    Returns the (possibly new) CSR matrix and the previous value (0 if unset).
+    Existing entries are updated in place; new entries cost one O(nnz) insert.
+    """
+    n_rows, n_cols = max(matrix.shape[0], row + 1), max(matrix.shape[1], col + 1)
+    indptr = matrix.indptr
+    if n_rows > matrix.shape[0]:
+        indptr = np.concatenate([indptr, np.full(n_rows - matrix.shape[0], indptr[-1],
+                                                 dtype=indptr.dtype)])
+    start, end = indptr[row], indptr[row + 1]
+    pos = start + np.searchsorted(matrix.indices[start:end], col)
+
+    if pos < end and matrix.indices[pos] == col:
+        old = float(matrix.data[pos])
+        matrix.data[pos] = value
+        indices, data = matrix.indices, matrix.data
+    else:
+        old = 0.0
+        indices = np.insert(matrix.indices, pos, col)
+        data = np.insert(matrix.data, pos, value)
+        indptr = indptr.copy()
+        indptr[row + 1:] += 1
+
+    if (n_rows, n_cols) == matrix.shape and indices is matrix.indices:
+        return matrix, old
+    updated = sparse.csr_matrix((data, indices, indptr), shape=(n_rows, n_cols))
+    updated.has_sorted_indices = True
+    return updated, old
+
+
+def _row_mean(matrix, row):
+    """Mean of the stored (rated) values of a CSR row, NaN if empty"""
+    start, end = matrix.indptr[row], matrix.indptr[row + 1]
+    if end == start:
+        return np.nan
+    return float(matrix.data[start:end].mean())
+
 
 class CollaborativeFiltering:
-    def __init__(self, data_path='../data/ratings_clean.csv'):
-        self.ratings = pd.read_csv(data_path)
+    def __init__(self, data_path='../data/ratings_clean.csv', n_neighbors=50, n_jobs=1,
+                 max_block_mb=256):
+        # Memory-mapped columnar cache of the csv (int32 ids, int8 ratings)
+        self.ratings = load_ratings(data_path)
         self.train_data, self.test_data = self._split_data()
         self.user_item_matrix = None
         self.item_user_matrix = None
-        self.user_similarity = None
-        self.item_similarity = None
+        self.n_neighbors = n_neighbors
+        self.n_jobs = n_jobs
+        self.max_block_mb = max_block_mb
+        self.user_neighbors = None
+        self.item_neighbors = None
+        self.user_map = None
+        self.movie_map = None
+        self.global_mean = np.nan
+        self.user_means = None
+        self.item_means = None
+        self._rating_keys = None
+        self.user_sq_norms = None
+        self.item_sq_norms = None
+        self._rating_sum = 0.0
+        self._rating_count = 0
+
+    @property
+    def user_ids(self):
+        return self.user_map.ids
+
+    @property
+    def movie_ids(self):
+        return self.movie_map.ids
 
     def _split_data(self):
         """Split data into train/test sets with stratification"""
@@ -23,96 +116,243 @@ class CollaborativeFiltering:
         )
 
     def _create_matrices(self):
-        """Create user-item and item-user matrices"""
-        self.user_item_matrix = self.train_data.pivot_table(
-            index='user_id',
-            columns='movie_id',
-            values='rating'
-        ).fillna(0)
-        self.item_user_matrix = self.user_item_matrix.T
-
-    def _calculate_similarities(self):
-        """Pre-compute similarity matrices"""
-        self.user_similarity = cosine_similarity(self.user_item_matrix)
-        self.item_similarity = cosine_similarity(self.item_user_matrix)
+        """Create sparse user-item and item-user matrices (CSR, append-only id maps)"""
+        self.user_map = IdMap.fit(self.train_data['user_id'].values)
+        self.movie_map = IdMap.fit(self.train_data['movie_id'].values)
+
+        rows = self.user_map.transform(self.train_data['user_id'].values)
+        cols = self.movie_map.transform(self.train_data['movie_id'].values)
+        values = self.train_data['rating'].values.astype(np.float32)
+
+        self.user_item_matrix = sparse.csr_matrix(
+            (values, (rows, cols)),
+            shape=(len(self.user_ids), len(self.movie_ids))
+        )
+        self.user_item_matrix.sort_indices()
+        self.item_user_matrix = self.user_item_matrix.T.tocsr()
+        self.item_user_matrix.sort_indices()
+        self._rating_sum = float(values.sum(dtype=np.float64))
+        self._rating_count = len(values)
+        self.global_mean = self._rating_sum / self._rating_count
+        self.user_means = _row_means(self.user_item_matrix)
+        self.item_means = _row_means(self.item_user_matrix)
+        self.user_sq_norms = _row_sq_norms(self.user_item_matrix)
+        self.item_sq_norms = _row_sq_norms(self.item_user_matrix)
+        self._build_rating_keys()
+
+    def _build_rating_keys(self):
+        """Sorted (row * n_items + col) keys of every stored rating, for batch lookups"""
+        n_items = self.user_item_matrix.shape[1]
+        row_of_entry = np.repeat(np.arange(self.user_item_matrix.shape[0], dtype=np.int64),
+                                 np.diff(self.user_item_matrix.indptr))
+        self._rating_keys = row_of_entry * n_items + self.user_item_matrix.indices
+
+    def _lookup_ratings(self, user_idx, movie_idx):
+        """Ratings at broadcast (user_idx, movie_idx) positions, 0 where unrated"""
+        user_idx, movie_idx = np.broadcast_arrays(user_idx, movie_idx)
+        keys = user_idx.astype(np.int64) * self.user_item_matrix.shape[1] + movie_idx
+        pos = np.minimum(np.searchsorted(self._rating_keys, keys), len(self._rating_keys) - 1)
+        found = (self._rating_keys[pos] == keys) & (user_idx >= 0) & (movie_idx >= 0)
+        return np.where(found, self.user_item_matrix.data[pos], 0).astype(np.float32)
+
+    def _calculate_similarities(self, k=None, metric='cosine'):
+        """Pre-compute top-K user and item neighbor indexes for a similarity metric"""
+        k = max(self.n_neighbors, k or 0)
+        options = dict(k=k, max_block_mb=self.max_block_mb, n_jobs=self.n_jobs, metric=metric)
+        self.user_neighbors = NeighborIndex.build(self.user_item_matrix, ids=self.user_ids, **options)
+        self.item_neighbors = NeighborIndex.build(self.item_user_matrix, ids=self.movie_ids, **options)
+
+    def _similarity_row(self, side, pos):
+        """Cosine similarities of one user (or item) against all others, from the norm accumulators"""
+        if side == 'user':
+            matrix, transposed, sq_norms = self.user_item_matrix, self.item_user_matrix, self.user_sq_norms
+        else:
+            matrix, transposed, sq_norms = self.item_user_matrix, self.user_item_matrix, self.item_sq_norms
+        # Accumulate dot products over the co-raters of each entry of row `pos`
+        start, end = matrix.indptr[pos], matrix.indptr[pos + 1]
+        cols, values = matrix.indices[start:end], matrix.data[start:end]
+        starts, lengths = transposed.indptr[cols], np.diff(transposed.indptr)[cols]
+        entries = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        dots = np.bincount(
+            transposed.indices[entries],
+            weights=transposed.data[entries] * np.repeat(values, lengths),
+            minlength=matrix.shape[0]
+        )
+        norms = np.sqrt(sq_norms)
+        denominators = norms[pos] * norms
+        scores = np.divide(dots, denominators, out=np.zeros(len(dots)), where=denominators > 0)
+        scores[pos] = -np.inf
+        return scores.astype(np.float32)
+
+    def apply_rating(self, user_id, movie_id, rating):
+        """Add or change one rating and refresh only the affected neighbor rows.
+
+        Updates the sparse matrices, means, squared-norm accumulators and both
+        neighbor indexes in place, so no rebuild is needed. Only the changed
+        user's and movie's similarity rows are recomputed. Other top-K lists
+        are patched, and fully rescored only when their K-th neighbor may have
+        changed. Requires indexes built with the 'cosine' metric; unseen users
+        and movies are appended to the index maps.
+        """
+        for index in (self.user_neighbors, self.item_neighbors):
+            if index.metric != 'cosine':
+                raise ValueError(f"Incremental updates need a 'cosine' index, got '{index.metric}'")
+
+        user_idx = self.user_map.get(user_id)
+        if user_idx < 0:
+            user_idx = int(self.user_map.add([user_id])[0])
+            self.user_means = np.append(self.user_means, np.nan)
+            self.user_sq_norms = np.append(self.user_sq_norms, 0.0)
+        movie_idx = self.movie_map.get(movie_id)
+        new_movie = movie_idx < 0
+        if new_movie:
+            movie_idx = int(self.movie_map.add([movie_id])[0])
+            self.item_means = np.append(self.item_means, np.nan)
+            self.item_sq_norms = np.append(self.item_sq_norms, 0.0)
+
+        rating = float(rating)
+        self.user_item_matrix, old = _csr_set(self.user_item_matrix, user_idx, movie_idx, rating)
+        self.item_user_matrix, _ = _csr_set(self.item_user_matrix, movie_idx, user_idx, rating)
+
+        if new_movie:
+            self._build_rating_keys()
+        elif old == 0:
+            key = user_idx * self.user_item_matrix.shape[1] + movie_idx
+            self._rating_keys = np.insert(self._rating_keys, np.searchsorted(self._rating_keys, key), key)
+
+        self._rating_sum += rating - old
+        self._rating_count += old == 0
+        self.global_mean = self._rating_sum / self._rating_count
+        self.user_means[user_idx] = _row_mean(self.user_item_matrix, user_idx)
+        self.item_means[movie_idx] = _row_mean(self.item_user_matrix, movie_idx)
+        self.user_sq_norms[user_idx] += rating ** 2 - old ** 2
+        self.item_sq_norms[movie_idx] += rating ** 2 - old ** 2
+
+        self.user_neighbors.update_row(user_idx, self._similarity_row('user', user_idx),
+                                       lambda pos: self._similarity_row('user', pos))
+        self.item_neighbors.update_row(movie_idx, self._similarity_row('item', movie_idx),
+                                       lambda pos: self._similarity_row('item', pos))
+        self.user_neighbors.ids = self.user_ids
+        self.item_neighbors.ids = self.movie_ids
+
+    def save_neighbors(self, directory):
+        """Save the user and item neighbor indexes to `directory`"""
+        self.user_neighbors.save(os.path.join(directory, 'user_neighbors.npz'))
+        self.item_neighbors.save(os.path.join(directory, 'item_neighbors.npz'))
+
+    def load_neighbors(self, directory):
+        """Load neighbor indexes saved with `save_neighbors`"""
+        self.user_neighbors = NeighborIndex.load(os.path.join(directory, 'user_neighbors.npz'))
+        self.item_neighbors = NeighborIndex.load(os.path.join(directory, 'item_neighbors.npz'))
 
     def user_based_predict(self, user_id, movie_id, k=10):
         """User-based prediction with fallback strategies"""
-        try:
-            if user_id not in self.user_item_matrix.index:
-                return np.nan
-            
-            similar_users = np.argsort(self.user_similarity[user_id-1])[::-1][1:k+1]
-            similar_ratings = self.user_item_matrix.iloc[similar_users][movie_id]
-            valid_ratings = similar_ratings[similar_ratings != 0]
-            
-            if len(valid_ratings) > 0:
-                return valid_ratings.mean()
-            
-            user_avg = self.user_item_matrix.loc[user_id].mean()
-            if not np.isnan(user_avg):
-                return user_avg
-            
-            return self.train_data['rating'].mean()
-        except KeyError:
+        user_idx = self.user_map.get(user_id)
+        movie_idx = self.movie_map.get(movie_id)
+        if user_idx < 0 or movie_idx < 0:
             return np.nan
 
+        similar_users = self.user_neighbors.neighbors[user_idx, :k]
+        similar_ratings = _row_values(self.item_user_matrix, movie_idx, similar_users)
+        valid_ratings = similar_ratings[similar_ratings != 0]
+
+        if len(valid_ratings) > 0:
+            return float(valid_ratings.mean())
+
+        user_avg = _row_mean(self.user_item_matrix, user_idx)
+        if not np.isnan(user_avg):
+            return user_avg
+
+        return self.global_mean
+
     def item_based_predict(self, user_id, movie_id, k=10):
         """Item-based prediction with fallback strategies"""
-        try:
-            if movie_id not in self.item_user_matrix.index:
-                return np.nan
-            
-            movie_idx = self.item_user_matrix.index.get_loc(movie_id)
-            similar_items = np.argsort(self.item_similarity[movie_idx])[::-1][1:k+1]
-            similar_movie_ids = self.item_user_matrix.index[similar_items]
-            similar_ratings = self.user_item_matrix.loc[user_id, similar_movie_ids]
-            valid_ratings = similar_ratings[similar_ratings != 0]
-            
-            if len(valid_ratings) > 0:
-                return valid_ratings.mean()
-            
-            item_avg = self.item_user_matrix.loc[movie_id].mean()
-            if not np.isnan(item_avg):
-                return item_avg
-            
-            user_avg = self.user_item_matrix.loc[user_id].mean()
-            if not np.isnan(user_avg):
-                return user_avg
-            
-            return self.train_data['rating'].mean()
-        except KeyError:
+        user_idx = self.user_map.get(user_id)
+        movie_idx = self.movie_map.get(movie_id)
+        if user_idx < 0 or movie_idx < 0:
             return np.nan
 
-    def evaluate(self, model_type='user', k=10):
-        """Evaluate model performance"""
+        similar_items = self.item_neighbors.neighbors[movie_idx, :k]
+        similar_ratings = _row_values(self.user_item_matrix, user_idx, similar_items)
+        valid_ratings = similar_ratings[similar_ratings != 0]
+
+        if len(valid_ratings) > 0:
+            return float(valid_ratings.mean())
+
+        item_avg = _row_mean(self.item_user_matrix, movie_idx)
+        if not np.isnan(item_avg):
+            return item_avg
+
+        user_avg = _row_mean(self.user_item_matrix, user_idx)
+        if not np.isnan(user_avg):
+            return user_avg
+
+        return self.global_mean
+
+    def predict_many(self, user_ids, movie_ids, k=10, model_type='user', batch_size=65536):
+        """Vectorized user- or item-based predictions for aligned id arrays.
+
+        Applies the same neighbor average and fallback chain as
+        `user_based_predict`/`item_based_predict`, returning NaN for unknown
+        users or movies.
+        """
+        user_idx = self.user_map.transform(user_ids)
+        movie_idx = self.movie_map.transform(movie_ids)
+        predictions = np.full(len(user_idx), np.nan)
+
+        known = np.flatnonzero((user_idx >= 0) & (movie_idx >= 0))
+        for start in range(0, len(known), batch_size):
+            rows = known[start:start + batch_size]
+            users, movies = user_idx[rows], movie_idx[rows]
+
+            if model_type == 'user':
+                similar_users = self.user_neighbors.neighbors[users, :k]
+                similar_ratings = self._lookup_ratings(similar_users, movies[:, None])
+                fallback = self.user_means[users]
+            else:
+                similar_items = self.item_neighbors.neighbors[movies, :k]
+                similar_ratings = self._lookup_ratings(users[:, None], similar_items)
+                fallback = self.item_means[movies]
+                fallback = np.where(np.isnan(fallback), self.user_means[users], fallback)
+            fallback = np.where(np.isnan(fallback), self.global_mean, fallback)
+
+            counts = np.count_nonzero(similar_ratings, axis=1)
+            sums = similar_ratings.sum(axis=1, dtype=np.float64)
+            predictions[rows] = np.where(counts > 0, sums / np.maximum(counts, 1), fallback)
+
+        return predictions
+
+    def evaluate(self, model_type='user', k=10, metric='cosine'):
+        """Evaluate model performance with a metric from similarity.SIMILARITY_METRICS"""
         self._create_matrices()
-        self._calculate_similarities()
+        self._calculate_similarities(k, metric)
         
         valid_test_data = self.test_data[
-            (self.test_data['user_id'].isin(self.user_item_matrix.index)) &
-            (self.test_data['movie_id'].isin(self.user_item_matrix.columns))
+            (self.test_data['user_id'].isin(self.user_ids)) &
+            (self.test_data['movie_id'].isin(self.movie_ids))
         ]
         
-        actual = []
-        predicted = []
-        predict_func = self.user_based_predict if model_type == 'user' else self.item_based_predict
-        
-        for _, row in valid_test_data.iterrows():
-            pred = predict_func(row['user_id'], row['movie_id'], k)
-            if not np.isnan(pred):
-                actual.append(row['rating'])
-                predicted.append(pred)
-        
+        predicted = self.predict_many(
+            valid_test_data['user_id'].values,
+            valid_test_data['movie_id'].values,
+            k=k,
+            model_type=model_type
+        )
+        has_prediction = ~np.isnan(predicted)
+        valid_test_data = valid_test_data[has_prediction]
+        actual = valid_test_data['rating'].values
+        predicted = predicted[has_prediction]
+
         if len(actual) > 0:
             rmse = np.sqrt(mean_squared_error(actual, predicted))
             mae = mean_absolute_error(actual, predicted)
-            print(f"\n{model_type.title()}-Based Collaborative Filtering")
+            print(f"\n{model_type.title()}-Based Collaborative Filtering ({metric})")
             print(f"RMSE: {rmse:.2f}, MAE: {mae:.2f}")
             print("Sample Predictions:")
             for i in range(min(5, len(actual))):
                 print(f"User {valid_test_data.iloc[i]['user_id']} -> Movie {valid_test_data.iloc[i]['movie_id']}: "
                       f"Predicted {predicted[i]:.1f} vs Actual {actual[i]}")
+            return rmse, mae
         else:
             print("Error: No valid predictions generated")
 
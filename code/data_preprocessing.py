@@ -1,25 +1,17 @@
-import pandas as pd
+from reco_core.dataset_cache import load_ratings, load_movies
 
 def load_and_clean_data():
-    ratings = pd.read_csv('../data/u.data', sep='\t', names=['user_id', 'movie_id', 'rating', 'timestamp'])
-    movies = pd.read_csv('../data/u.item', sep='|', encoding='latin-1', 
-                        names=['movie_id', 'title', 'release_date', 'video_release', 'imdb_url', 
-                               'unknown', 'Action', 'Adventure', 'Animation', 'Children\'s', 
-                               'Comedy', 'Crime', 'Documentary', 'Drama', 'Fantasy', 
-                               'Film-Noir', 'Horror', 'Musical', 'Mystery', 'Romance', 
-                               'Sci-Fi', 'Thriller', 'War', 'Western'])
+    # Parsed once into the columnar cache (data/.npy_cache), memory-mapped afterwards
+    ratings = load_ratings('../data/u.data')
+    movies = load_movies('../data/u.item')
     
     # Drop unnecessary columns
-    movies.drop(columns=['video_release', 'imdb_url', 'unknown'], inplace=True)
-    ratings.drop(columns=['timestamp'], inplace=True)
-    
-    # Cleaning steps
-    movies.drop(columns=['video_release', 'imdb_url', 'unknown'], inplace=True)
-    ratings.drop(columns=['timestamp'], inplace=True)
+    movies = movies.drop(columns=['video_release', 'imdb_url', 'unknown'])
+    ratings = ratings.drop(columns=['timestamp'])
     
     # Save cleaned data
-    ratings.to_csv('data/ratings_clean.csv', index=False)
-    movies.to_csv('data/movies_clean.csv', index=False)
+    ratings.to_csv('../data/ratings_clean.csv', index=False)
+    movies.to_csv('../data/movies_clean.csv', index=False)
 
 if __name__ == "__main__":
-    load_and_clean_data()
\ No newline at end of file
+    load_and_clean_data()
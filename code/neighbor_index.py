@@ -0,0 +1,107 @@
+import numpy as np
+from reco_core.similarity import blocked_similarity, _top_k
+
+
+class NeighborIndex:
+    """Top-K neighbors of every row of a sparse matrix.
+
+    `neighbors[i]` holds the row positions of the K rows most similar to row i
+    (itself excluded), sorted by decreasing similarity, and `scores[i]` the
+    matching similarities under `metric`. `ids` optionally maps positions
+    back to raw ids.
+    """
+
+    def __init__(self, neighbors, scores, ids=None, metric='cosine'):
+        self.neighbors = np.asarray(neighbors, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.ids = None if ids is None else np.asarray(ids, dtype=np.int32)
+        self.metric = metric
+
+    @property
+    def k(self):
+        return self.neighbors.shape[1]
+
+    def __len__(self):
+        return self.neighbors.shape[0]
+
+    @classmethod
+    def build(cls, matrix, k=50, block_size=None, max_block_mb=256, n_jobs=1, ids=None,
+              metric='cosine'):
+        """Build the index from blocked similarities, never holding the full n x n matrix"""
+        neighbors, scores = blocked_similarity(
+            matrix,
+            top_k=k,
+            block_size=block_size,
+            max_block_mb=max_block_mb,
+            n_jobs=n_jobs,
+            metric=metric
+        )
+        return cls(neighbors, scores, ids=ids, metric=metric)
+
+    def update_row(self, pos, row_scores, rescore):
+        """Refresh the index after the vector of row `pos` changed (or was appended).
+
+        `row_scores` holds the new similarities of `pos` against every row
+        (itself set to -inf) and `rescore(i)` returns the full similarity row
+        of row i. Since only similarities involving `pos` changed, the only
+        other rows touched are those that listed `pos` and those where `pos`
+        now beats the K-th neighbor. A row is rescored only when `pos` drops
+        below its old K-th score.
+        """
+        row_scores = np.asarray(row_scores, dtype=np.float32)
+        k = self.k
+        if pos >= len(self):
+            grow = pos + 1 - len(self)
+            self.neighbors = np.vstack([self.neighbors, np.zeros((grow, k), dtype=np.int32)])
+            self.scores = np.vstack([self.scores, np.full((grow, k), -np.inf, dtype=np.float32)])
+        if k == 0:
+            return
+
+        neighbors, scores = _top_k(row_scores[None, :], k)
+        self.neighbors[pos], self.scores[pos] = neighbors[0], scores[0]
+
+        listed = self.neighbors == pos
+        listed[pos] = False
+        has_pos = listed.any(axis=1)
+        kth = self.scores[:, -1].copy()
+
+        stays = has_pos & (row_scores >= kth)
+        self.scores[listed & stays[:, None]] = row_scores[stays]
+        enters = ~has_pos & (row_scores > kth)
+        enters[pos] = False
+        self.neighbors[enters, -1] = pos
+        self.scores[enters, -1] = row_scores[enters]
+
+        resort = np.flatnonzero(stays | enters)
+        order = np.argsort(-self.scores[resort], axis=1, kind='stable')
+        self.neighbors[resort] = np.take_along_axis(self.neighbors[resort], order, axis=1)
+        self.scores[resort] = np.take_along_axis(self.scores[resort], order, axis=1)
+
+        for row in np.flatnonzero(has_pos & ~stays):
+            neighbors, scores = _top_k(np.asarray(rescore(row), dtype=np.float32)[None, :], k)
+            self.neighbors[row], self.scores[row] = neighbors[0], scores[0]
+
+    def lookup(self, raw_id, k=None):
+        """Raw ids and scores of the neighbors of a raw id (requires `ids`)"""
+        matches = np.flatnonzero(self.ids == raw_id)
+        if len(matches) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        pos = matches[0]
+        k = self.k if k is None else k
+        return self.ids[self.neighbors[pos, :k]], self.scores[pos, :k]
+
+    def save(self, path):
+        """Save the index to a .npz file"""
+        arrays = {'neighbors': self.neighbors, 'scores': self.scores,
+                  'metric': np.array(self.metric)}
+        if self.ids is not None:
+            arrays['ids'] = self.ids
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with `save`"""
+        with np.load(path) as data:
+            ids = data['ids'] if 'ids' in data.files else None
+            metric = str(data['metric']) if 'metric' in data.files else 'cosine'
+            return cls(data['neighbors'], data['scores'], ids=ids, metric=metric)
@@ -2,31 +2,16 @@
 import os
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'  # Suppress TensorFlow info messages
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'  # Disable oneDNN message specifically
+# TensorFlow is only imported when a model has no NumPy export yet (see load_model)
 
-import tensorflow as tf
-tf.get_logger().setLevel('ERROR')  # Suppress TensorFlow warnings
-
+import sys
 import numpy as np
 import pickle
 import pandas as pd
 
-# Define RatingScaler class (must match training)
-class RatingScaler(tf.keras.layers.Layer):
-    def __init__(self, min_rating, max_rating, **kwargs):
-        super().__init__(**kwargs)
-        self.min_rating = min_rating
-        self.max_rating = max_rating
-        
-    def call(self, inputs):
-        return inputs * (self.max_rating - self.min_rating) + self.min_rating
-        
-    def get_config(self):
-        config = super().get_config()
-        config.update({
-            'min_rating': self.min_rating,
-            'max_rating': self.max_rating
-        })
-        return config
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'reco_APP'))
+from numpy_scorer import NumpyScorer, load_scorer
+from reco_core.id_map import IdMap
 
 class RecommendationSystem:
     def __init__(self, model_dir='saved_models', data_dir='../data'):
@@ -34,8 +19,11 @@ class RecommendationSystem:
         self.data_dir = data_dir
         self.models = {}
         self.mappings = {}
+        self.user_map = IdMap()
+        self.movie_map = IdMap()
         self.movie_titles = {}
         self.loaded_model = None
+        self.scorer = None
         
         # Load resources
         self.load_movie_titles()
@@ -72,14 +60,17 @@ class RecommendationSystem:
         if os.path.exists(mappings_path):
             with open(mappings_path, 'rb') as f:
                 self.mappings = pickle.load(f)
+                self.user_map = IdMap.from_mapping(self.mappings['user_id_to_idx'])
+                self.movie_map = IdMap.from_mapping(self.mappings['movie_id_to_idx'])
                 print("Loaded ID mappings")
         
         # Discover available models
         self.available_models = {}
         for file in os.listdir(self.model_dir):
-            if file.endswith('.keras'):
-                model_name = file.replace('_model.keras', '')
-                self.available_models[model_name] = os.path.join(self.model_dir, file)
+            if file.endswith('_model.keras') or file.endswith('_model.npz'):
+                model_name, ext = file.rsplit('_model.', 1)
+                if ext == 'npz' or model_name not in self.available_models:
+                    self.available_models[model_name] = os.path.join(self.model_dir, file)
         
         print(f"Available models: {list(self.available_models.keys())}")
     
@@ -91,44 +82,37 @@ class RecommendationSystem:
             return False
         
         try:
-            self.loaded_model = tf.keras.models.load_model(
-                self.available_models[model_name],
-                custom_objects={'RatingScaler': RatingScaler}
-            )
+            # Prefer the NumPy export (export_numpy_models.py) and skip Keras entirely
+            path = self.available_models[model_name]
+            if path.endswith('.npz'):
+                self.loaded_model = None
+                self.scorer = load_scorer(path)
+            else:
+                from keras_layers import load_keras_model
+                self.loaded_model = load_keras_model(path)
+                self.scorer = NumpyScorer.from_keras(self.loaded_model)
             print(f"Loaded {model_name} model successfully")
             return True
         except Exception as e:
             print(f"Error loading model: {str(e)}")
             self.loaded_model = None
+            self.scorer = None
             return False
     
     def get_recommendations(self, user_id, top_n=10):
         """Generate recommendations for a user"""
-        if not self.loaded_model:
+        if self.scorer is None:
             print("No model loaded! Please load a model first.")
             return []
         
-        user_id_map = self.mappings.get('user_id_to_idx', {})
-        movie_id_map = self.mappings.get('movie_id_to_idx', {})
-        
-        if user_id not in user_id_map:
+        user_idx = self.user_map.get(user_id)
+        if user_idx < 0:
             print(f"User {user_id} not found in database")
             return []
         
-        # Prepare inputs
-        user_idx = user_id_map[user_id]
-        movie_ids = list(movie_id_map.keys())
-        movie_indices = list(movie_id_map.values())
-        
-        # Create input arrays
-        user_indices = np.full(len(movie_ids), user_idx)
-        movie_indices = np.array(movie_indices)
-        
-        # Predict ratings
-        predictions = self.loaded_model.predict(
-            [user_indices, movie_indices], 
-            verbose=0
-        ).flatten()
+        # Score the user against every movie in one NumPy pass (position i is movie_ids[i])
+        movie_ids = self.movie_map.ids
+        predictions = self.scorer.score_user(user_idx)[:len(movie_ids)]
         
         # Clip to valid rating range
         min_rating = self.mappings.get('min_rating', 0.5)
@@ -0,0 +1,25 @@
+# Export every saved Keras model to a NumPy .npz next to it, check it and time it
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'reco_APP'))
+from numpy_scorer import export_model, load_scorer
+from benchmark_scoring import benchmark_scoring, print_report
+from keras_layers import load_keras_model
+
+
+def export_all(model_dir='saved_models'):
+    """Write <name>_model.npz for each <name>_model.keras and report parity and latency"""
+    for file in sorted(os.listdir(model_dir)):
+        if not file.endswith('.keras'):
+            continue
+        keras_path = os.path.join(model_dir, file)
+        npz_path = keras_path.replace('.keras', '.npz')
+        model = load_keras_model(keras_path)
+        export_model(model, npz_path)
+        print(f"Exported {npz_path}")
+        print_report(file.replace('_model.keras', ''), benchmark_scoring(model, load_scorer(npz_path)))
+
+
+if __name__ == "__main__":
+    export_all()
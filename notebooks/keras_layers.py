@@ -0,0 +1,26 @@
+# Keras pieces needed to load the saved models (training and export only, never imported to serve)
+import tensorflow as tf
+tf.get_logger().setLevel('ERROR')  # Suppress TensorFlow warnings
+
+# Define RatingScaler class (must match training)
+class RatingScaler(tf.keras.layers.Layer):
+    def __init__(self, min_rating, max_rating, **kwargs):
+        super().__init__(**kwargs)
+        self.min_rating = min_rating
+        self.max_rating = max_rating
+        
+    def call(self, inputs):
+        return inputs * (self.max_rating - self.min_rating) + self.min_rating
+        
+    def get_config(self):
+        config = super().get_config()
+        config.update({
+            'min_rating': self.min_rating,
+            'max_rating': self.max_rating
+        })
+        return config
+
+
+def load_keras_model(path):
+    """Load a saved .keras model with the custom layers it may use"""
+    return tf.keras.models.load_model(path, custom_objects={'RatingScaler': RatingScaler})
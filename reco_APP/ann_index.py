@@ -0,0 +1,141 @@
+import json
+import numpy as np
+
+
+def kmeans(vectors, n_clusters, n_iter=20, seed=0):
+    """K-means (Lloyd) en NumPy : (centroïdes, cluster de chaque vecteur)"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].copy()
+    sq_norms = (vectors ** 2).sum(axis=1)
+    for _ in range(n_iter):
+        # |x - c|^2 = |x|^2 - 2 x.c + |c|^2
+        distances = sq_norms[:, None] - 2 * vectors @ centroids.T + (centroids ** 2).sum(axis=1)
+        assign = distances.argmin(axis=1)
+        counts = np.bincount(assign, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        order = np.argsort(assign, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        nonempty = counts > 0
+        sums[nonempty] = np.add.reduceat(vectors[order], starts[nonempty])
+        empty = ~nonempty
+        # Un cluster vide repart d'un point au hasard
+        sums[empty] = vectors[rng.choice(len(vectors), size=empty.sum(), replace=False)]
+        counts[empty] = 1
+        centroids = (sums / counts[:, None]).astype(vectors.dtype)
+    return centroids, assign
+
+
+def _top(scores, n):
+    """Positions des n plus grands scores, triées par score décroissant"""
+    if n < len(scores):
+        top = np.argpartition(-scores, n - 1)[:n]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class IVFIndex:
+    """Index IVF (listes inversées) pour le produit scalaire maximal.
+
+    Les vecteurs sont regroupés par k-means en `n_lists` listes ; une requête
+    ne parcourt que les `n_probe` listes dont le centroïde a le meilleur
+    produit scalaire avec elle, soit environ n_probe / n_lists du catalogue.
+    Dans ces listes, les scores sont d'abord approchés sur une projection en
+    `reduced_dim` dimensions (SVD), puis les `rerank * top_n` meilleurs sont
+    re-classés avec les vecteurs complets (re-classement exact).
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, reduced_dim=16, rerank=4, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.reduced_dim = reduced_dim
+        self.rerank = rerank
+        self.seed = seed
+
+    def build(self, vectors, n_iter=20, train_per_list=64):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(vectors))))
+        self.n_lists = n_lists
+        # k-means appris sur un échantillon (au plus `train_per_list` points par liste), puis appliqué à tous
+        train = vectors
+        if len(vectors) > train_per_list * n_lists:
+            rng = np.random.default_rng(self.seed)
+            train = vectors[rng.choice(len(vectors), size=train_per_list * n_lists, replace=False)]
+        self.centroids, _ = kmeans(train, n_lists, n_iter=n_iter, seed=self.seed)
+        sq_distances = (self.centroids ** 2).sum(axis=1) - 2 * vectors @ self.centroids.T
+        assign = sq_distances.argmin(axis=1)
+
+        # Vecteurs rangés liste par liste : la liste l occupe offsets[l]:offsets[l + 1]
+        order = np.argsort(assign, kind="stable")
+        self.ids = order.astype(np.int32)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))]).astype(np.int64)
+        self.vectors = vectors[order]
+
+        # Projection qui conserve au mieux les produits scalaires (SVD non centrée)
+        if self.reduced_dim and self.reduced_dim < vectors.shape[1]:
+            _, _, vt = np.linalg.svd(self.vectors, full_matrices=False)
+            self.projection = np.ascontiguousarray(vt[:self.reduced_dim].T)
+            self.reduced = self.vectors @ self.projection
+        else:
+            self.projection = None
+            self.reduced = self.vectors
+        return self
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _probe_rows(self, query, n_probe):
+        lists = _top(self.centroids @ query, min(n_probe, self.n_lists))
+        return np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+
+    def search(self, query, top_n=10, n_probe=None, rerank=None):
+        """(ids, scores) des top_n vecteurs de plus grand produit scalaire avec `query`.
+
+        rerank=0 renvoie le classement approché (scores approchés).
+        """
+        query = np.asarray(query, dtype=np.float32)
+        rerank = self.rerank if rerank is None else rerank
+        rows = self._probe_rows(query, n_probe or self.n_probe)
+
+        if self.projection is None:
+            scores = self.vectors[rows] @ query
+            keep = _top(scores, top_n)
+            return self.ids[rows[keep]], scores[keep]
+
+        approx = self.reduced[rows] @ (query @ self.projection)
+        if not rerank:
+            keep = _top(approx, top_n)
+            return self.ids[rows[keep]], approx[keep]
+
+        shortlist = rows[_top(approx, rerank * top_n)]
+        exact = self.vectors[shortlist] @ query
+        keep = _top(exact, top_n)
+        return self.ids[shortlist[keep]], exact[keep]
+
+    def save(self, path):
+        params = {"n_lists": self.n_lists, "n_probe": self.n_probe, "reduced_dim": self.reduced_dim,
+                  "rerank": self.rerank, "seed": self.seed}
+        arrays = {"centroids": self.centroids, "ids": self.ids, "offsets": self.offsets,
+                  "vectors": self.vectors, "params": np.array(json.dumps(params))}
+        if self.projection is not None:
+            arrays["projection"] = self.projection
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            index = cls(**json.loads(str(data["params"])))
+            index.centroids = data["centroids"]
+            index.ids = data["ids"]
+            index.offsets = data["offsets"]
+            index.vectors = data["vectors"]
+            index.projection = data["projection"] if "projection" in data.files else None
+        index.reduced = index.vectors if index.projection is None else index.vectors @ index.projection
+        return index
+
+
+def brute_force_search(vectors, query, top_n=10):
+    """Référence exacte : produit scalaire avec tous les vecteurs"""
+    scores = vectors @ np.asarray(query, dtype=np.float32)
+    keep = _top(scores, top_n)
+    return keep, scores[keep]
@@ -4,6 +4,10 @@ from rating_page import show_rating_page
 from recommendation_page import show_recommendation_page
 from rate_more_page import show_rate_more_page
 from rated_movies_page import show_rated_movies_page
+from tmdb_utils import start_poster_warm_up
+
+# Affiches des films populaires chargées en arrière-plan dès le démarrage du processus
+start_poster_warm_up()
 
 # Initialisation de l'état de session
 if "logged_in" not in st.session_state:
@@ -0,0 +1,58 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+from ann_index import IVFIndex, brute_force_search
+from numpy_scorer import load_scorer
+
+TWOTOWER_WEIGHTS = "../notebooks/saved_models/twotower_model.npz"
+
+
+def grow_catalog(item_vecs, n_items, seed=0):
+    """Catalogue synthétique de n_items vecteurs : copies bruitées des vrais vecteurs films"""
+    rng = np.random.default_rng(seed)
+    base = item_vecs[rng.integers(len(item_vecs), size=n_items)]
+    noise = rng.normal(scale=item_vecs.std(axis=0) * 0.3, size=base.shape)
+    return (base + noise).astype(np.float32)
+
+
+def benchmark_ann(item_vecs, queries, top_n=50, n_probes=(1, 2, 4, 8, 16), reranks=(0, 4)):
+    """recall@top_n et latence médiane par requête de l'IVF face à la recherche exhaustive"""
+    exact = [set(brute_force_search(item_vecs, q, top_n)[0]) for q in queries]
+
+    def timed(search):
+        times, recalls = [], []
+        for q, truth in zip(queries, exact):
+            start = time.perf_counter()
+            ids = search(q)
+            times.append(time.perf_counter() - start)
+            recalls.append(len(truth.intersection(ids)) / top_n)
+        return 1000 * np.median(times), np.mean(recalls)
+
+    latency, recall = timed(lambda q: brute_force_search(item_vecs, q, top_n)[0])
+    rows = [{"method": "brute force", "n_probe": None, "rerank": None,
+             "recall": recall, "latency_ms": latency}]
+
+    start = time.perf_counter()
+    index = IVFIndex().build(item_vecs)
+    build_s = time.perf_counter() - start
+    for n_probe in n_probes:
+        for rerank in reranks:
+            latency, recall = timed(lambda q: index.search(q, top_n, n_probe=n_probe, rerank=rerank)[0])
+            rows.append({"method": f"ivf ({index.n_lists} listes)", "n_probe": n_probe, "rerank": rerank,
+                         "recall": recall, "latency_ms": latency})
+    return pd.DataFrame(rows).astype({"n_probe": "Int64", "rerank": "Int64"}), build_s
+
+
+if __name__ == "__main__":
+    # python benchmark_ann.py [tailles de catalogue synthétiques...]
+    scorer = load_scorer(TWOTOWER_WEIGHTS)
+    item_vecs = scorer.item_tower()
+    users = np.random.default_rng(0).choice(scorer.num_users, size=200, replace=False)
+    queries = [scorer.user_tower(u) for u in users]
+
+    sizes = [int(n) for n in sys.argv[1:]] or [100_000]
+    for name, vectors in [("two-tower", item_vecs)] + [(f"synthétique {n}", grow_catalog(item_vecs, n)) for n in sizes]:
+        table, build_s = benchmark_ann(vectors, queries)
+        print(f"\n{name} : {len(vectors)} films, index construit en {build_s:.2f} s (recall@50)")
+        print(table.to_string(index=False, float_format="{:.3f}".format))
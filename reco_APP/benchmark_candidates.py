@@ -0,0 +1,87 @@
+import time
+import numpy as np
+import pandas as pd
+from ratings_index import RatingsIndex
+from recommendation_page import get_user_predictions
+
+
+class FixedScorer:
+    """Scores tirés une fois pour toutes : on ne mesure que la construction des candidats"""
+
+    def __init__(self, num_items, seed=0):
+        self.scores = np.random.default_rng(seed).uniform(1, 5, num_items).astype(np.float32)
+
+    def score_user(self, user_idx=None, user_vector=None, item_idx=None):
+        return self.scores if item_idx is None else self.scores[item_idx]
+
+
+def _legacy_predictions(scorer, user_id, ratings, movies, top_n=10):
+    """Ancienne construction : filtres du DataFrame, dict movie_id -> idx, compréhension de liste"""
+    user_rows = ratings[ratings["user_id"] == user_id]
+    user_idx = user_rows["user_idx"].iloc[0]
+    rated_movies = ratings[ratings["user_id"] == user_id]["movie_id"].unique()
+    unrated_movies = np.setdiff1d(ratings["movie_id"].unique(), rated_movies)
+    known_items = ratings[ratings["item_idx"] >= 0]
+    movie_id_to_idx = known_items[["movie_id", "item_idx"]].drop_duplicates().set_index("movie_id")["item_idx"].to_dict()
+    movie_id_to_title = movies.set_index("movie_id")["title"].to_dict()
+    candidates = [(mid, movie_id_to_idx[mid]) for mid in unrated_movies if mid in movie_id_to_idx]
+    X_item = np.array([item_idx for _, item_idx in candidates])
+    predictions = scorer.score_user(user_idx)[X_item]
+    top_indices = predictions.argsort()[-top_n:][::-1]
+    rated_movie_ids = ratings[ratings["user_id"] == user_id]["movie_id"].astype(int).tolist()
+    results = []
+    for i in top_indices:
+        movie_id = candidates[i][0]
+        if movie_id not in rated_movie_ids:
+            results.append((movie_id_to_title.get(movie_id, f"Film {movie_id}"), float(f"{predictions[i]:.2f}")))
+    return results
+
+
+def synthetic_ratings(n_items, n_users=1000, ratings_per_user=100, seed=0):
+    """Notes au hasard (popularité en loi de Zipf) sur un catalogue de n_items films"""
+    rng = np.random.default_rng(seed)
+    popularity = 1 / np.arange(1, n_items + 1)
+    rows = [(u, m) for u in range(1, n_users + 1)
+            for m in rng.choice(n_items, size=min(ratings_per_user, n_items), replace=False, p=popularity / popularity.sum()) + 1]
+    ratings = pd.DataFrame(rows, columns=["user_id", "movie_id"])
+    ratings["rating"] = rng.integers(1, 6, len(ratings)).astype(float)
+    ratings["user_idx"] = ratings["user_id"] - 1
+    ratings["item_idx"] = ratings["movie_id"] - 1
+    movies = pd.DataFrame({"movie_id": np.arange(1, n_items + 1),
+                           "title": [f"Film {i}" for i in range(1, n_items + 1)]})
+    return ratings, movies
+
+
+def benchmark_candidates(sizes=(1_000, 10_000, 100_000), n_users=20, top_n=10, seed=0):
+    """Durée médiane d'un top-N sur tout le catalogue, ancienne construction face au RatingsIndex"""
+    rows = []
+    for n_items in sizes:
+        ratings, movies = synthetic_ratings(n_items, seed=seed)
+        scorer = FixedScorer(n_items, seed)
+        start = time.perf_counter()
+        index = RatingsIndex(ratings, movies)
+        build_ms = 1000 * (time.perf_counter() - start)
+
+        users = np.random.default_rng(seed).choice(index.user_ids, size=n_users, replace=False)
+        legacy, vectorized = [], []
+        for user_id in users:
+            start = time.perf_counter()
+            expected = _legacy_predictions(scorer, user_id, ratings, movies, top_n)
+            legacy.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            result = get_user_predictions(scorer, user_id, index, top_n)
+            vectorized.append(time.perf_counter() - start)
+            assert [score for _, score in result] == [score for _, score in expected]
+        rows.append({
+            "n_items": n_items,
+            "n_ratings": len(ratings),
+            "legacy_ms": 1000 * np.median(legacy),
+            "vectorized_ms": 1000 * np.median(vectorized),
+            "speedup": np.median(legacy) / np.median(vectorized),
+            "index_build_ms": build_ms,
+        })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    print(benchmark_candidates().to_string(index=False, float_format="{:.2f}".format))
@@ -0,0 +1,61 @@
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from reco_core.dataset_cache import CACHE_DIRNAME, load_ratings, load_movies, _parse_ratings, _parse_movies
+
+# (fichier, chargeur, parseur texte, colonnes lues par l'application)
+SOURCES = [
+    ("data/u.data", load_ratings, _parse_ratings, None),
+    ("data/u.item", load_movies, _parse_movies, ["movie_id", "title"]),
+    ("../data/ratings_clean.csv", load_ratings, _parse_ratings, None),
+]
+
+
+def _median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1000 * np.median(times)
+
+
+def benchmark_dataset(repeat=20):
+    """Lecture texte (pandas), construction du cache binaire (premier chargement) et
+    chargement à chaud (memmap) pour chaque fichier source.
+
+    Chaque source est copiée dans un dossier temporaire : le cache de
+    l'application (data/.npy_cache) n'est jamais touché.
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for source, loader, parser, columns in SOURCES:
+            if not os.path.exists(source):
+                continue
+            path = os.path.join(tmp, os.path.basename(source))
+            shutil.copy2(source, path)
+            cache_dir = os.path.join(tmp, CACHE_DIRNAME, os.path.basename(path))
+
+            start = time.perf_counter()
+            loader(path)
+            build_ms = 1000 * (time.perf_counter() - start)
+
+            cache_bytes = sum(os.path.getsize(os.path.join(root, f))
+                              for root, _, files in os.walk(cache_dir) for f in files)
+            rows.append({
+                "file": source,
+                "text_parse_ms": _median_ms(lambda: parser(path), repeat),
+                "cold_build_ms": build_ms,
+                "warm_load_ms": _median_ms(lambda: loader(path), repeat),
+                "warm_app_columns_ms": _median_ms(lambda: loader(path, columns=columns), repeat),
+                "source_kb": os.path.getsize(path) / 1024,
+                "cache_kb": cache_bytes / 1024,
+            })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    print(benchmark_dataset().to_string(index=False, float_format="{:.2f}".format))
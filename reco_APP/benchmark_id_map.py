@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+from reco_core.id_map import IdMap
+from reco_core.dataset_cache import load_ratings
+from benchmark_dataset import _median_ms
+
+
+def benchmark_id_map(repeat=20, n_new=100):
+    """IdMap face à LabelEncoder sur les movie_id de u.data : encodage, décodage, et
+    ajout d'ids inconnus (réajustement complet pour LabelEncoder)"""
+    movie_ids = load_ratings("data/u.data", columns=["movie_id"])["movie_id"].to_numpy()
+    new_ids = movie_ids.max() + 1 + np.arange(n_new)
+    encoder = LabelEncoder().fit(movie_ids)
+    id_map = IdMap.fit(movie_ids)
+    positions = id_map.transform(movie_ids)
+    assert (positions == encoder.transform(movie_ids)).all()
+
+    rows = [
+        {"operation": f"transform ({len(movie_ids)} ids)",
+         "label_encoder_ms": _median_ms(lambda: encoder.transform(movie_ids), repeat),
+         "id_map_ms": _median_ms(lambda: id_map.transform(movie_ids), repeat)},
+        {"operation": f"inverse ({len(movie_ids)} index)",
+         "label_encoder_ms": _median_ms(lambda: encoder.inverse_transform(positions), repeat),
+         "id_map_ms": _median_ms(lambda: id_map.inverse(positions), repeat)},
+        {"operation": f"ajout de {n_new} ids",
+         "label_encoder_ms": _median_ms(lambda: LabelEncoder().fit(np.concatenate([movie_ids, new_ids])), repeat),
+         "id_map_ms": _median_ms(lambda: IdMap(id_map.ids).add(new_ids), repeat)},
+    ]
+    report = pd.DataFrame(rows)
+    report["speedup"] = report["label_encoder_ms"] / report["id_map_ms"]
+    return report
+
+
+if __name__ == "__main__":
+    print(benchmark_id_map().to_string(index=False, float_format="{:.3f}".format))
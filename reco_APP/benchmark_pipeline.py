@@ -0,0 +1,37 @@
+import time
+import numpy as np
+import pandas as pd
+from recommendation_page import (load_mlp_scorer, load_ratings_index, load_candidate_generators,
+                                 get_user_predictions, new_ratings_version)
+
+
+def benchmark_pipeline(n_users=100, top_n=10, model_dir="models", candidate_sizes=None, seed=0):
+    """Durée médiane par étape du pipeline à deux étapes, face à la notation de tous les films,
+    et part du top-N complet retrouvée par le pipeline"""
+    scorer = load_mlp_scorer(model_dir)
+    index = load_ratings_index(model_dir, new_ratings_version())
+    generators = load_candidate_generators(model_dir)
+    users = np.random.default_rng(seed).choice(index.user_ids, size=n_users, replace=False)
+
+    rows = []
+    for user_id in users:
+        timings = {}
+        start = time.perf_counter()
+        two_stage = get_user_predictions(scorer, user_id, index, top_n, model_key=model_dir,
+                                         generators=generators, candidate_sizes=candidate_sizes, timings=timings)
+        timings["total_two_stage"] = 1000 * (time.perf_counter() - start)
+
+        full_timings = {}
+        start = time.perf_counter()
+        full = get_user_predictions(scorer, user_id, index, top_n, model_key=model_dir,
+                                    timings=full_timings)
+        timings["total_full"] = 1000 * (time.perf_counter() - start)
+        timings["rerank_full"] = full_timings["rerank"]
+        if full:
+            timings["overlap"] = len({t for t, _ in two_stage} & {t for t, _ in full}) / len(full)
+        rows.append(timings)
+    return pd.DataFrame(rows).median()
+
+
+if __name__ == "__main__":
+    print(benchmark_pipeline().to_string(float_format="{:.3f}".format))
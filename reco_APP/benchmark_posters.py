@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import tempfile
+import requests
+import numpy as np
+import pandas as pd
+import tmdb_utils
+from fake_tmdb_server import fake_tmdb_server
+from poster_cache import PosterCache, JsonPosterStore
+
+
+def _sequential(titles):
+    """Ancien comportement : une requête bloquante (sans session) par titre, l'une après l'autre"""
+    posters = {}
+    for title in titles:
+        response = requests.get(f"{tmdb_utils.TMDB_BASE_URL}/search/movie",
+                                params={"api_key": tmdb_utils.TMDB_API_KEY, "query": title})
+        results = response.json().get("results")
+        posters[title] = tmdb_utils.TMDB_IMAGE_BASE + results[0]["poster_path"] if results else None
+    return posters
+
+
+def benchmark_posters(top_ns=(5, 10, 15), latency=0.05):
+    """Affiches d'un top-N depuis un faux TMDB (`latency` s par requête) : séquentiel face au
+    résolveur parallèle, cache froid puis cache chaud"""
+    rows = []
+    with fake_tmdb_server(latency=latency, missing={"Film 3"}) as server, tempfile.TemporaryDirectory() as tmp:
+        tmdb_utils.TMDB_BASE_URL = server.base_url
+        for top_n in top_ns:
+            titles = [f"Film {i}" for i in range(top_n)]
+            cache = PosterCache(JsonPosterStore(os.path.join(tmp, f"poster_cache_{top_n}.json")))
+
+            start = time.perf_counter()
+            _sequential(titles)
+            sequential_ms = 1000 * (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            posters = tmdb_utils.get_movie_posters(titles, cache=cache)
+            cold_ms = 1000 * (time.perf_counter() - start)
+
+            n_requests = len(server.requests)
+            start = time.perf_counter()
+            tmdb_utils.get_movie_posters(titles, cache=cache)
+            warm_ms = 1000 * (time.perf_counter() - start)
+
+            rows.append({
+                "top_n": top_n,
+                "sequential_ms": sequential_ms,
+                "concurrent_cold_ms": cold_ms,
+                "concurrent_warm_ms": warm_ms,
+                "warm_requests": len(server.requests) - n_requests,
+                "missing": sum(url is None for url in posters.values()),
+            })
+            cache.flush()
+    return pd.DataFrame(rows)
+
+
+def benchmark_lookup(n_entries=1682, top_n=10, repeat=50):
+    """Lecture de top_n affiches en cache : relecture du JSON à chaque appel (ancien
+    get_movie_poster) face au PosterCache en mémoire"""
+    titles = [f"Film {i}" for i in range(n_entries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "poster_cache.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({title: f"{tmdb_utils.TMDB_IMAGE_BASE}/{i}.jpg" for i, title in enumerate(titles)}, f, indent=2)
+        cache = PosterCache(JsonPosterStore(path))
+
+        def reload_json():
+            for title in titles[:top_n]:
+                with open(path, "r", encoding="utf-8") as f:
+                    json.load(f)[title]
+
+        timings = {}
+        for name, fn in [("json_per_title_ms", reload_json),
+                         ("poster_cache_ms", lambda: cache.get_many(titles[:top_n], tmdb_utils.NEGATIVE_TTL_SECONDS))]:
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fn()
+                times.append(time.perf_counter() - start)
+            timings[name] = 1000 * np.median(times)
+    return timings
+
+
+if __name__ == "__main__":
+    print(benchmark_posters().to_string(index=False, float_format="{:.1f}".format))
+    print()
+    for name, ms in benchmark_lookup().items():
+        print(f"{name}: {ms:.3f}")
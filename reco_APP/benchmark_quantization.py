@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import time
+import pickle
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from reco_core.dataset_cache import load_ratings
+from reco_core.id_map import IdMap, load_model_id_maps
+from numpy_scorer import load_scorer, export_arrays, GRAPH_KEY, MANIFEST_FILE
+from quantization import QUANTIZATIONS
+from benchmark_workers import synthetic_model
+from candidate_generators import TWOTOWER_MAPPINGS
+
+# Nom -> (poids, correspondances id -> index ; None : IdMap de models/)
+MODELS = {
+    # Entraîné sur tout u.data : sa RMSE sur le jeu de test est mesurée en échantillon
+    "mlp (en échantillon)": ("models/mlp_model", None),
+    "ncf": ("../notebooks/saved_models/ncf_model.npz", "../notebooks/saved_models/mappings.pkl"),
+    "two-tower": ("models/twotower_model", TWOTOWER_MAPPINGS),
+}
+
+
+def model_arrays(path):
+    """Poids float32 (copies en mémoire) et graphe d'un export .npz ou en dossier"""
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return {key: data[key] for key in data.files}
+    scorer = load_scorer(path)
+    arrays = {f"{name}/{i}": np.array(w) for name, ws in scorer.weights.items() for i, w in enumerate(ws)}
+    with open(os.path.join(path, MANIFEST_FILE), "r") as f:
+        arrays[GRAPH_KEY] = np.array(json.dumps(json.load(f)["graph"]))
+    return arrays
+
+
+def standard_split():
+    """Jeux d'entraînement et de test standard de u.data : 20 %, stratifié par utilisateur,
+    random_state=42 (comme Neural_network_model.ipynb)"""
+    ratings = load_ratings("data/u.data", columns=["user_id", "movie_id", "rating"])
+    return train_test_split(ratings, test_size=0.2, stratify=ratings["user_id"], random_state=42)
+
+
+def test_split(mappings_path=None):
+    """Couples (user_idx, item_idx, note) du jeu de test standard connus du modèle"""
+    _, test = standard_split()
+    if mappings_path is not None:
+        with open(mappings_path, "rb") as f:
+            mappings = pickle.load(f)
+        user_map = IdMap.from_mapping(mappings["user_id_to_idx"])
+        item_map = IdMap.from_mapping(mappings["movie_id_to_idx"])
+    else:
+        user_map, item_map = load_model_id_maps("models")
+    user_idx = user_map.transform(test["user_id"])
+    item_idx = item_map.transform(test["movie_id"])
+    known = (user_idx >= 0) & (item_idx >= 0)
+    return user_idx[known], item_idx[known], test["rating"].to_numpy(np.float32)[known]
+
+
+def _dir_mb(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 2**20
+
+
+def _score_users(scorer, users):
+    """(utilisateurs notés par seconde face à tout le catalogue, pic d'allocation en Mo)"""
+    scorer.score_user(users[0])
+    tracemalloc.start()
+    start = time.perf_counter()
+    for user_idx in users:
+        scorer.score_user(user_idx)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return len(users) / elapsed, peak / 2**20
+
+
+def benchmark_quantization(arrays, test=None, n_users=100):
+    """RMSE (écart au float32), taille de l'export et débit de notation par format d'embedding"""
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for quantization in (None,) + QUANTIZATIONS:
+            path = os.path.join(tmp, quantization or "float32")
+            export_arrays(arrays, path, quantization=quantization)
+            scorer = load_scorer(path)
+            row = {"format": quantization or "float32"}
+            if test is not None:
+                user_idx, item_idx, y = test
+                row["rmse"] = float(np.sqrt(np.mean((scorer.predict(user_idx, item_idx) - y) ** 2)))
+            users = np.random.default_rng(0).choice(scorer.num_users, size=min(n_users, scorer.num_users),
+                                                   replace=False)
+            row["disk_mb"] = _dir_mb(path)
+            row["users_per_s"], row["peak_alloc_mb"] = _score_users(scorer, users)
+            rows.append(row)
+    table = pd.DataFrame(rows)
+    if test is not None:
+        table.insert(2, "rmse_delta", table["rmse"] - table["rmse"].iloc[0])
+    return table
+
+
+if __name__ == "__main__":
+    # python benchmark_quantization.py [tailles de catalogue synthétiques...]
+    for name, (path, mappings_path) in MODELS.items():
+        print(f"\n{name} : jeu de test standard de u.data")
+        table = benchmark_quantization(model_arrays(path), test_split(mappings_path))
+        print(table.to_string(index=False, float_format="{:.6f}".format))
+
+    for num_items in [int(n) for n in sys.argv[1:]] or [200_000]:
+        print(f"\nmlp synthétique : {num_items} films")
+        table = benchmark_quantization(synthetic_model(num_items), n_users=20)
+        print(table.to_string(index=False, float_format="{:.2f}".format))
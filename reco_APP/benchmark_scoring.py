@@ -0,0 +1,45 @@
+import time
+import numpy as np
+from numpy_scorer import NumpyScorer
+
+TOLERANCE = 1e-4
+
+
+def benchmark_scoring(model, scorer, n_users=50, seed=0):
+    """Latence par utilisateur (tous les films) de model.predict face au scoreur NumPy,
+    et écart maximal entre les deux sorties"""
+    rng = np.random.default_rng(seed)
+    users = rng.choice(scorer.num_users, size=min(n_users, scorer.num_users), replace=False)
+    items = np.arange(scorer.num_items)
+
+    keras_times, numpy_times, max_diff = [], [], 0.0
+    scorer.score_user(users[0])  # remplit le cache côté films
+    for user_idx in users:
+        start = time.perf_counter()
+        expected = model.predict([np.full(len(items), user_idx), items], verbose=0).flatten()
+        keras_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        scores = scorer.score_user(user_idx)
+        numpy_times.append(time.perf_counter() - start)
+        max_diff = max(max_diff, float(np.abs(scores - expected).max()))
+
+    return {
+        "keras_ms": 1000 * np.median(keras_times),
+        "numpy_ms": 1000 * np.median(numpy_times),
+        "speedup": np.median(keras_times) / np.median(numpy_times),
+        "max_abs_diff": max_diff,
+    }
+
+
+def print_report(name, result):
+    status = "✅" if result["max_abs_diff"] <= TOLERANCE else "❌"
+    print(f"{name}: Keras {result['keras_ms']:.2f} ms | NumPy {result['numpy_ms']:.2f} ms "
+          f"| x{result['speedup']:.1f} | écart max {result['max_abs_diff']:.2e} {status}")
+
+
+if __name__ == "__main__":
+    from tensorflow.keras.models import load_model
+
+    model = load_model("models/mlp_model.keras")
+    print_report("mlp", benchmark_scoring(model, NumpyScorer.from_keras(model)))
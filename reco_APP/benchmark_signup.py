@@ -0,0 +1,47 @@
+import os
+import time
+import tempfile
+import numpy as np
+from multiprocessing import Pool
+import database
+from utils import get_next_ml_user_id
+
+
+def _use_db(path):
+    # Base jetable : la séquence de data/app.db n'est pas consommée
+    database.DB_PATH = path
+
+
+def _allocate(n):
+    return [get_next_ml_user_id() for _ in range(n)]
+
+
+def benchmark_signup(n_calls=200, n_processes=8):
+    """Latence d'allocation d'un ml_user_id et unicité sous inscriptions concurrentes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path, previous = os.path.join(tmp, "app.db"), database.DB_PATH
+        _use_db(path)
+        try:
+            get_next_ml_user_id()   # initialise la séquence
+            times = []
+            for _ in range(n_calls):
+                start = time.perf_counter()
+                get_next_ml_user_id()
+                times.append(time.perf_counter() - start)
+
+            with Pool(n_processes, initializer=_use_db, initargs=(path,)) as pool:
+                ids = [i for chunk in pool.map(_allocate, [n_calls // n_processes] * n_processes) for i in chunk]
+        finally:
+            _use_db(previous)
+            database._pools.pop(path, None)
+    return {
+        "median_ms": 1000 * np.median(times),
+        "p99_ms": 1000 * np.percentile(times, 99),
+        "concurrent_ids": len(ids),
+        "duplicates": len(ids) - len(set(ids)),
+    }
+
+
+if __name__ == "__main__":
+    for key, value in benchmark_signup().items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
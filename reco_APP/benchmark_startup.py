@@ -0,0 +1,53 @@
+import sys
+import json
+import subprocess
+import pandas as pd
+
+# Chaque scénario tourne dans un processus neuf : import, chargement du modèle, premier top-N
+SCENARIOS = {
+    "keras load_model": """
+from tensorflow.keras.models import load_model
+import numpy as np
+model = load_model("models/mlp_model.keras")
+num_items = [layer for layer in model.layers if layer.__class__.__name__ == "Embedding"][1].input_dim
+scores = model.predict([np.zeros(num_items, dtype=np.int64), np.arange(num_items)], verbose=0)
+""",
+    "numpy memmap": """
+from numpy_scorer import load_scorer
+scorer = load_scorer("models/mlp_model")
+scores = scorer.score_user(0)
+""",
+    "page recommandations (memmap)": """
+from recommendation_page import load_mlp_scorer
+scores = load_mlp_scorer("models").score_user(0)
+""",
+}
+
+PROBE = """
+import sys, time, json, resource
+start = time.perf_counter()
+{code}
+print(json.dumps({{"cold_start_s": time.perf_counter() - start,
+                   "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                   "tensorflow_imported": "tensorflow" in sys.modules}}))
+"""
+
+
+def benchmark_startup(repeat=3):
+    """Démarrage à froid (s) et mémoire max (Mo) de chaque manière de servir le modèle"""
+    rows = []
+    for name, code in SCENARIOS.items():
+        runs = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", PROBE.format(code=code)],
+                                 capture_output=True, text=True, check=True).stdout
+            runs.append(json.loads(out.strip().splitlines()[-1]))
+        runs = pd.DataFrame(runs)
+        rows.append({"scenario": name, "cold_start_s": runs["cold_start_s"].median(),
+                     "max_rss_mb": runs["max_rss_mb"].median(),
+                     "tensorflow_imported": bool(runs["tensorflow_imported"].any())})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    print(benchmark_startup().to_string(index=False, float_format="{:.2f}".format))
@@ -0,0 +1,58 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from reco_core.id_map import IdMap
+from train_mlp_model import build_model, fit_model, scaled_learning_rate, BASE_LEARNING_RATE
+from benchmark_quantization import standard_split
+
+
+def encoded_split():
+    """Jeu d'entraînement et de test standard de u.data, ids encodés sur toutes les notes"""
+    train, test = standard_split()
+    ratings = pd.concat([train, test])
+    user_map, item_map = IdMap.fit(ratings["user_id"]), IdMap.fit(ratings["movie_id"])
+    for df in (train, test):
+        df["user_idx"] = user_map.transform(df["user_id"])
+        df["item_idx"] = item_map.transform(df["movie_id"])
+    return train, test, len(user_map), len(item_map)
+
+
+def _test_rmse(model, test):
+    predictions = model.predict([test["user_idx"].values, test["item_idx"].values], batch_size=8192, verbose=0)
+    return float(np.sqrt(np.mean((predictions[:, 0] - test["rating"].values) ** 2)))
+
+
+def benchmark_training(batch_sizes=(256, 1024, 4096), max_epochs=30, seed=42):
+    """RMSE de test et durée d'entraînement : ancien fit (tableaux NumPy, lots de 64,
+    5 epochs) face au pipeline tf.data avec arrêt anticipé, par taille de lot"""
+    train, test, num_users, num_items = encoded_split()
+    X_user, X_item, y = train["user_idx"].values, train["item_idx"].values, train["rating"].values
+    rows = []
+
+    tf.keras.utils.set_random_seed(seed)
+    model = build_model(num_users, num_items)
+    start = time.perf_counter()
+    model.fit([X_user, X_item], y, batch_size=64, epochs=5, verbose=0)
+    elapsed = time.perf_counter() - start
+    rows.append({"pipeline": "numpy fit", "batch_size": 64, "learning_rate": BASE_LEARNING_RATE,
+                 "epochs": 5, "train_s": elapsed, "samples_per_sec": 5 * len(y) / elapsed,
+                 "test_rmse": _test_rmse(model, test)})
+
+    for batch_size in batch_sizes:
+        tf.keras.utils.set_random_seed(seed)
+        learning_rate = scaled_learning_rate(batch_size)
+        model = build_model(num_users, num_items, learning_rate=learning_rate)
+        start = time.perf_counter()
+        summary = fit_model(model, X_user, X_item, y, max_epochs, batch_size, seed=seed, verbose=0)
+        rows.append({"pipeline": "tf.data", "batch_size": batch_size, "learning_rate": learning_rate,
+                     "epochs": summary["epochs_trained"], "train_s": time.perf_counter() - start,
+                     "samples_per_sec": summary["samples_per_sec"], "test_rmse": _test_rmse(model, test)})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    # python benchmark_training.py [tailles de lot...]
+    batch_sizes = [int(n) for n in sys.argv[1:]] or (256, 1024, 4096)
+    print(benchmark_training(batch_sizes).to_string(index=False, float_format="{:.4f}".format))
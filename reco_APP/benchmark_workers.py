@@ -0,0 +1,68 @@
+import os
+import json
+import tempfile
+import numpy as np
+import pandas as pd
+import multiprocessing as mp
+from numpy_scorer import load_scorer, export_arrays, GRAPH_KEY, MANIFEST_FILE
+
+
+def _memory_mb():
+    """Rss, Pss (pages partagées divisées entre processus) et mémoire privée du processus, en Mo"""
+    values = {}
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                values[key] = int(rest.split()[0]) / 1024
+    return {"rss_mb": values["Rss"], "pss_mb": values["Pss"],
+            "private_mb": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def _worker(path, barrier, results):
+    scorer = load_scorer(path)
+    for user_idx in range(5):
+        scorer.score_user(user_idx)
+    barrier.wait()          # tous les processus sont chargés en même temps
+    results.put(_memory_mb())
+    barrier.wait()
+
+
+def synthetic_model(num_items, base_path="models/mlp_model"):
+    """Graphe du MLP de models/ avec une table de films agrandie à num_items lignes"""
+    scorer = load_scorer(base_path)
+    rng = np.random.default_rng(0)
+    arrays = {f"{name}/{i}": np.array(w) for name, ws in scorer.weights.items() for i, w in enumerate(ws)}
+    table = arrays[f"{scorer.item_embedding}/0"]
+    arrays[f"{scorer.item_embedding}/0"] = rng.normal(0, table.std(), (num_items, table.shape[1])).astype(np.float32)
+    with open(os.path.join(base_path, MANIFEST_FILE), "r") as f:
+        arrays[GRAPH_KEY] = np.array(json.dumps(json.load(f)["graph"]))
+    return arrays
+
+
+def benchmark_workers(worker_counts=(1, 2, 4, 8), num_items=200_000):
+    """Mémoire par processus quand N serveurs chargent le même modèle : .npz (copie
+    par processus) face au dossier mappé en mémoire (pages partagées)"""
+    arrays = synthetic_model(num_items)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        npz_path = os.path.join(tmp, "mlp_model.npz")
+        np.savez(npz_path, **arrays)
+        export_arrays(arrays, os.path.join(tmp, "mlp_model"))
+        context = mp.get_context("spawn")
+        for layout, path in [("npz", npz_path), ("memmap", os.path.join(tmp, "mlp_model"))]:
+            for n in worker_counts:
+                barrier, results = context.Barrier(n), context.Queue()
+                workers = [context.Process(target=_worker, args=(path, barrier, results)) for _ in range(n)]
+                for worker in workers:
+                    worker.start()
+                memory = pd.DataFrame([results.get() for _ in workers])
+                for worker in workers:
+                    worker.join()
+                rows.append({"layout": layout, "workers": n, **memory.mean().to_dict(),
+                             "total_pss_mb": memory["pss_mb"].sum()})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    print(benchmark_workers().to_string(index=False, float_format="{:.1f}".format))
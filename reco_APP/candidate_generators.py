@@ -0,0 +1,142 @@
+import os
+import time
+import pickle
+import numpy as np
+from scipy.sparse import csr_matrix
+from ann_index import IVFIndex
+from numpy_scorer import load_scorer
+from reco_core.id_map import IdMap
+from reco_core.similarity import blocked_similarity
+
+
+def _parse_sizes(value):
+    """"item_cf=300,popularity=20" -> {"item_cf": 300, "popularity": 20}"""
+    sizes = {}
+    for part in value.split(","):
+        if part.strip():
+            name, _, size = part.partition("=")
+            sizes[name.strip()] = int(size)
+    return sizes
+
+
+# Nombre de candidats demandés à chaque générateur (avant union et re-classement MLP),
+# surchargeable par CANDIDATE_SIZES="item_cf=300,two_tower=300,popularity=50"
+CANDIDATE_SIZES = {"item_cf": 200, "two_tower": 200, "popularity": 50,
+                   **_parse_sizes(os.environ.get("CANDIDATE_SIZES", ""))}
+# Taille de catalogue à partir de laquelle la page passe par les candidats : en dessous,
+# noter tous les films est plus rapide et rend le vrai top-N du MLP (0 : toujours)
+TWO_STAGE_MIN_ITEMS = int(os.environ.get("TWO_STAGE_MIN_ITEMS", 50_000))
+
+TWOTOWER_WEIGHTS = "models/twotower_model"
+# Correspondances id -> index enregistrées par le notebook avec le modèle two-tower
+TWOTOWER_MAPPINGS = "../notebooks/saved_models/mappings.pkl"
+
+
+def _top_unrated(scores, movie_ids, rated_movie_ids, n):
+    """Les n movie_id de plus haut score, sans les films déjà notés"""
+    scores = np.where(np.isin(movie_ids, rated_movie_ids), -np.inf, scores)
+    n = min(n, int(np.isfinite(scores).sum()))
+    if n <= 0:
+        return movie_ids[:0]
+    top = np.argpartition(-scores, n - 1)[:n]
+    return movie_ids[top[np.argsort(-scores[top], kind="stable")]]
+
+
+class PopularityGenerator:
+    """Films les plus notés"""
+
+    def __init__(self, ratings):
+        self.movie_ids, counts = np.unique(ratings["movie_id"].values, return_counts=True)
+        self.scores = counts.astype(np.float32)
+
+    def candidates(self, user_id, rated_movie_ids, rated_values, n):
+        return _top_unrated(self.scores, self.movie_ids, rated_movie_ids, n)
+
+
+class ItemNeighborsGenerator:
+    """Voisins (cosinus) des films que l'utilisateur a notés, pondérés par ses notes centrées"""
+
+    def __init__(self, ratings, k=50, block_size=1024):
+        self.movie_map = IdMap.fit(ratings["movie_id"].values)
+        self.movie_ids = self.movie_map.ids
+        item_pos = self.movie_map.transform(ratings["movie_id"].values)
+        user_pos = IdMap.fit(ratings["user_id"].values).transform(ratings["user_id"].values)
+        matrix = csr_matrix((ratings["rating"].values.astype(np.float32), (item_pos, user_pos)))
+        matrix.sum_duplicates()
+
+        # Top-K voisins par blocs de lignes, sans garder la matrice n x n
+        self.neighbors, self.scores = blocked_similarity(matrix, top_k=k, block_size=block_size)
+
+    def candidates(self, user_id, rated_movie_ids, rated_values, n):
+        pos = self.movie_map.transform(rated_movie_ids)
+        known = pos >= 0
+        if not known.any():
+            return self.movie_ids[:0]
+        weights = np.asarray(rated_values, dtype=np.float32)[known]
+        weights = weights - weights.mean() + 1e-3
+        scores = np.zeros(len(self.movie_ids), dtype=np.float32)
+        np.add.at(scores, self.neighbors[pos[known]], weights[:, None] * self.scores[pos[known]])
+        scores[scores <= 0] = -np.inf
+        return _top_unrated(scores, self.movie_ids, rated_movie_ids, n)
+
+
+class TwoTowerGenerator:
+    """Films les plus proches (ANN) du vecteur utilisateur du modèle two-tower.
+
+    Un utilisateur inconnu du two-tower est représenté par la moyenne des
+    vecteurs film des films qu'il a notés au-dessus de sa moyenne.
+    """
+
+    def __init__(self, weights_path=TWOTOWER_WEIGHTS, mappings_path=TWOTOWER_MAPPINGS):
+        self.scorer = load_scorer(weights_path)
+        with open(mappings_path, "rb") as f:
+            mappings = pickle.load(f)
+        self.user_map = IdMap.from_mapping(mappings["user_id_to_idx"])
+        self.movie_map = IdMap.from_mapping(mappings["movie_id_to_idx"])
+        self.movie_ids = self.movie_map.ids
+
+        self.item_vecs = self.scorer.item_tower()
+        self.index = IVFIndex().build(self.item_vecs)
+
+    def _query(self, user_id, rated_movie_ids, rated_values):
+        user_idx = self.user_map.get(user_id)
+        if user_idx >= 0:
+            return self.scorer.user_tower(user_idx)
+        pos = self.movie_map.transform(rated_movie_ids)
+        known = pos >= 0
+        values = np.asarray(rated_values, dtype=np.float32)
+        liked = known & (values >= values.mean())
+        if not liked.any():
+            return None
+        return self.item_vecs[pos[liked]].mean(axis=0)
+
+    def candidates(self, user_id, rated_movie_ids, rated_values, n):
+        query = self._query(user_id, rated_movie_ids, rated_values)
+        if query is None:
+            return self.movie_ids[:0]
+        # Marge pour les films déjà notés, retirés ensuite
+        ids, _ = self.index.search(query, top_n=n + len(rated_movie_ids))
+        movie_ids = self.movie_ids[ids]
+        return movie_ids[~np.isin(movie_ids, rated_movie_ids)][:n]
+
+
+def use_two_stage(num_items, min_items=TWO_STAGE_MIN_ITEMS):
+    """Passer par la génération de candidats pour un catalogue de num_items films ?"""
+    return num_items >= min_items
+
+
+def generate_candidates(generators, user_id, rated_movie_ids, rated_values, sizes=None, timings=None):
+    """Union (ordre d'arrivée) des candidats de chaque générateur ; `timings` reçoit les ms par générateur"""
+    sizes = {**CANDIDATE_SIZES, **(sizes or {})}
+    rated_movie_ids = np.asarray(rated_movie_ids)
+    parts = []
+    for name, generator in generators.items():
+        start = time.perf_counter()
+        parts.append(generator.candidates(user_id, rated_movie_ids, rated_values, sizes.get(name, 100)))
+        if timings is not None:
+            timings[name] = 1000 * (time.perf_counter() - start)
+    if not parts:
+        return np.array([], dtype=np.int64)
+    merged = np.concatenate(parts).astype(np.int64)
+    _, first = np.unique(merged, return_index=True)
+    return merged[np.sort(first)]
@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+import pandas as pd
+
+DB_PATH = "data/app.db"
+# Anciens fichiers, importés une seule fois à la création de la base
+LEGACY_USERS_FILE = "users.json"
+LEGACY_RATINGS_FILE = "data/new_ratings.csv"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    ml_user_id INTEGER NOT NULL UNIQUE,
+    initial_ratings_done INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS ratings (
+    user_id INTEGER NOT NULL,
+    movie_id INTEGER NOT NULL,
+    rating REAL NOT NULL,
+    timestamp INTEGER NOT NULL,
+    PRIMARY KEY (user_id, movie_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_ratings_movie ON ratings (movie_id);
+CREATE TABLE IF NOT EXISTS posters (
+    title TEXT PRIMARY KEY,
+    poster TEXT,
+    checked_at REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class ConnectionPool:
+    """Connexions SQLite réutilisées par les threads d'un processus.
+
+    Chaque connexion est en mode WAL (lecteurs jamais bloqués par un
+    écrivain) avec synchronous=FULL : une écriture validée est sur disque.
+    Après un fork, le processus enfant repart d'un pool vide.
+    """
+
+    def __init__(self, path=DB_PATH, size=8):
+        self.path = path
+        self.size = size
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        if self._pid != os.getpid():
+            self._pid, self._idle = os.getpid(), queue.LifoQueue()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if self._idle.qsize() < self.size:
+                self._idle.put(conn)
+            else:
+                conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+@contextmanager
+def connect(path=None):
+    """Connexion du pool de ce processus (base créée et migrée au premier appel)"""
+    path = path or DB_PATH
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path)
+            with pool.connection() as conn:
+                _init_db(conn)
+    with pool.connection() as conn:
+        yield conn
+
+
+@contextmanager
+def transaction(conn):
+    """BEGIN IMMEDIATE ... COMMIT : le verrou d'écriture est pris dès le début"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _init_db(conn):
+    conn.executescript(SCHEMA)
+    with transaction(conn):
+        if conn.execute("SELECT value FROM meta WHERE key = 'legacy_imported'").fetchone():
+            return
+        if os.path.exists(LEGACY_USERS_FILE):
+            with open(LEGACY_USERS_FILE, "r") as f:
+                users = json.load(f) or {}
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password, ml_user_id, initial_ratings_done) VALUES (?, ?, ?, ?)",
+                [(name, info["password"], int(info["ml_user_id"]), int(info.get("initial_ratings_done", False)))
+                 for name, info in users.items()])
+        if os.path.exists(LEGACY_RATINGS_FILE):
+            try:
+                legacy = pd.read_csv(LEGACY_RATINGS_FILE)
+            except pd.errors.EmptyDataError:
+                legacy = pd.DataFrame(columns=["user_id", "movie_id", "rating"])
+            timestamps = legacy["timestamp"] if "timestamp" in legacy.columns else [0] * len(legacy)
+            _upsert_ratings(conn, zip(legacy["user_id"], legacy["movie_id"], legacy["rating"], timestamps))
+        conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', 1)")
+
+
+# ---------- Notes ----------
+
+def _upsert_ratings(conn, rows):
+    rows = [(int(u), int(m), float(r), int(t)) for u, m, r, t in rows]
+    # Une nouvelle note sur le même film remplace l'ancienne
+    conn.executemany(
+        "INSERT INTO ratings (user_id, movie_id, rating, timestamp) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (user_id, movie_id) DO UPDATE SET rating = excluded.rating, timestamp = excluded.timestamp",
+        rows)
+    conn.execute("INSERT INTO meta (key, value) VALUES ('ratings_version', 1) "
+                 "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+    # Compteur par utilisateur : les résultats en cache des autres utilisateurs restent valides
+    conn.executemany("INSERT INTO meta (key, value) VALUES (?, 1) "
+                     "ON CONFLICT (key) DO UPDATE SET value = value + 1",
+                     [(f"ratings_version:{user_id}",) for user_id in {u for u, _, _, _ in rows}])
+
+
+def add_ratings(rows):
+    """Enregistrer des notes (user_id, movie_id, rating) en une seule transaction"""
+    now = int(time.time())
+    with connect() as conn, transaction(conn):
+        _upsert_ratings(conn, [(u, m, r, now) for u, m, r in rows])
+
+
+def add_rating(user_id, movie_id, rating):
+    add_ratings([(user_id, movie_id, rating)])
+
+
+def read_new_ratings():
+    with connect() as conn:
+        return pd.read_sql_query("SELECT user_id, movie_id, rating, timestamp FROM ratings", conn)
+
+
+def get_user_ratings(user_id):
+    """Notes d'un utilisateur (lecture par la clé primaire, sans parcourir la table)"""
+    with connect() as conn:
+        return pd.read_sql_query("SELECT user_id, movie_id, rating, timestamp FROM ratings WHERE user_id = ?",
+                                 conn, params=(int(user_id),))
+
+
+def count_ratings():
+    with connect() as conn:
+        return conn.execute("SELECT COUNT(*) FROM ratings").fetchone()[0]
+
+
+def ratings_version():
+    """Compteur incrémenté à chaque écriture de notes (clé de cache)"""
+    with connect() as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'ratings_version'").fetchone()
+        return row[0] if row else 0
+
+
+def user_ratings_version(user_id):
+    """Compteur incrémenté à chaque écriture de notes de cet utilisateur, dans tous les processus"""
+    with connect() as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (f"ratings_version:{int(user_id)}",)).fetchone()
+        return row[0] if row else 0
+
+
+# ---------- Utilisateurs ----------
+
+def get_user(username):
+    with connect() as conn:
+        row = conn.execute("SELECT username, password, ml_user_id, initial_ratings_done FROM users WHERE username = ?",
+                           (username,)).fetchone()
+    if row is None:
+        return None
+    return {"username": row[0], "password": row[1], "ml_user_id": row[2], "initial_ratings_done": bool(row[3])}
+
+
+def create_user(username, password, ml_user_id):
+    """Créer un compte ; False si le nom d'utilisateur est déjà pris"""
+    with connect() as conn, transaction(conn):
+        try:
+            conn.execute("INSERT INTO users (username, password, ml_user_id) VALUES (?, ?, ?)",
+                         (username, password, int(ml_user_id)))
+        except sqlite3.IntegrityError:
+            return False
+        # Un id choisi hors de l'allocateur ne doit jamais être redonné
+        conn.execute("UPDATE meta SET value = MAX(value, ?) WHERE key = 'next_ml_user_id'", (int(ml_user_id) + 1,))
+    return True
+
+
+def set_initial_ratings_done(username, done=True):
+    with connect() as conn:
+        conn.execute("UPDATE users SET initial_ratings_done = ? WHERE username = ?", (int(done), username))
+
+
+def allocate_ml_user_id(seed=None):
+    """Réserver le prochain ml_user_id (séquence dans meta, O(1) et atomique).
+
+    La séquence est initialisée une seule fois, au premier appel, à
+    max(seed(), plus grand ml_user_id des comptes) + 1 ; `seed` donne le plus
+    grand user_id du jeu de données. BEGIN IMMEDIATE sérialise les
+    inscriptions simultanées : deux appels ne rendent jamais le même id.
+    """
+    with connect() as conn, transaction(conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'next_ml_user_id'").fetchone()
+        if row is None:
+            max_user = conn.execute("SELECT MAX(ml_user_id) FROM users").fetchone()[0] or 0
+            next_id = max(seed() if seed is not None else 0, max_user) + 1
+        else:
+            next_id = row[0]
+        conn.execute("INSERT INTO meta (key, value) VALUES ('next_ml_user_id', ?) "
+                     "ON CONFLICT (key) DO UPDATE SET value = excluded.value", (next_id + 1,))
+    return next_id
+
+
+# ---------- Affiches TMDB (stockage optionnel du cache d'affiches) ----------
+
+def _poster_value(poster, checked_at):
+    return poster if poster else {"poster": None, "checked_at": checked_at or 0}
+
+
+def read_posters(limit):
+    """Les `limit` dernières affiches ajoutées, au format de poster_cache.json"""
+    with connect() as conn:
+        rows = conn.execute("SELECT title, poster, checked_at FROM posters ORDER BY rowid DESC LIMIT ?",
+                            (int(limit),)).fetchall()
+    return {title: _poster_value(poster, checked_at) for title, poster, checked_at in reversed(rows)}
+
+
+def get_posters(titles):
+    titles = list(titles)
+    if not titles:
+        return {}
+    placeholders = ",".join("?" * len(titles))
+    with connect() as conn:
+        rows = conn.execute(f"SELECT title, poster, checked_at FROM posters WHERE title IN ({placeholders})",
+                            titles).fetchall()
+    return {title: _poster_value(poster, checked_at) for title, poster, checked_at in rows}
+
+
+def put_posters(entries):
+    """Enregistrer {titre: url ou {"poster": None, "checked_at": ...}} en une transaction"""
+    rows = [(title, value, None) if isinstance(value, str) else (title, None, value.get("checked_at", 0))
+            for title, value in entries.items()]
+    with connect() as conn, transaction(conn):
+        conn.executemany("INSERT INTO posters (title, poster, checked_at) VALUES (?, ?, ?) "
+                         "ON CONFLICT (title) DO UPDATE SET poster = excluded.poster, checked_at = excluded.checked_at",
+                         rows)
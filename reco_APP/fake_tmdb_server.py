@@ -0,0 +1,61 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeTMDBHandler(BaseHTTPRequestHandler):
+    """Répond à /3/search/movie comme TMDB, après `latency` secondes"""
+
+    protocol_version = "HTTP/1.1"   # keep-alive, comme l'API réelle
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        title = parse_qs(url.query).get("query", [""])[0]
+        with server.lock:
+            server.requests.append(title)
+        time.sleep(server.latency)
+
+        if url.path != "/3/search/movie" or title in server.errors:
+            self.send_response(404 if url.path != "/3/search/movie" else 500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        results = [] if title in server.missing else [{"title": title, "poster_path": f"/{abs(hash(title))}.jpg"}]
+        body = json.dumps({"results": results}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def fake_tmdb_server(latency=0.05, missing=(), errors=()):
+    """Faux TMDB local, pour mesurer débit et latence des affiches sans réseau.
+
+    Rend le serveur : `server.base_url` remplace tmdb_utils.TMDB_BASE_URL et
+    `server.requests` liste les titres demandés. Les titres de `missing`
+    n'ont pas d'affiche, ceux de `errors` reçoivent une erreur 500.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeTMDBHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.missing = set(missing)
+    server.errors = set(errors)
+    server.requests = []
+    server.lock = threading.Lock()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/3"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,76 @@
+import threading
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from numpy_scorer import activate
+
+# Vecteurs déjà calculés : (modèle, user_id, empreinte des notes) -> vecteur utilisateur
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_SIZE = 1024
+
+
+def fold_in_user(weights, item_idx, ratings, l2=0.05, steps=150, lr=0.05):
+    """Vecteur utilisateur qui explique ses notes, embeddings films et tête MLP figés.
+
+    Minimise mean((f(u, q_i) - r_i)^2) + l2 * |u - moyenne|^2 par descente de
+    gradient (Adam) sur u seul. La rétropropagation est faite à la main dans
+    les couches denses, en partant du vecteur utilisateur moyen.
+    """
+    item_vecs = weights["item_embedding"][np.asarray(item_idx)]
+    ratings = np.asarray(ratings, dtype=np.float32)
+    prior = weights["user_embedding"].mean(axis=0)
+    dim = len(prior)
+
+    first_kernel, first_bias, first_activation = weights["dense"][0]
+    item_part = item_vecs @ first_kernel[dim:] + first_bias
+
+    u = prior.copy()
+    m, v = np.zeros_like(u), np.zeros_like(u)
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    for step in range(1, steps + 1):
+        # Propagation avant en gardant les pré-activations
+        z = u @ first_kernel[:dim] + item_part
+        pre_activations = [(z, first_activation)]
+        x = activate(z, first_activation)
+        for kernel, bias, activation in weights["dense"][1:]:
+            z = x @ kernel + bias
+            pre_activations.append((z, activation))
+            x = activate(z, activation)
+
+        # Rétropropagation jusqu'à u
+        grad = (2.0 / len(ratings)) * (x[:, 0] - ratings)[:, None]
+        kernels = [kernel for kernel, _, _ in weights["dense"]]
+        for i in range(len(kernels) - 1, -1, -1):
+            z, activation = pre_activations[i]
+            if activation == "relu":
+                grad = grad * (z > 0)
+            if i > 0:
+                grad = grad @ kernels[i].T
+        grad_u = grad.sum(axis=0) @ first_kernel[:dim].T + 2 * l2 * (u - prior)
+
+        m = beta1 * m + (1 - beta1) * grad_u
+        v = beta2 * v + (1 - beta2) * grad_u ** 2
+        u -= lr * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+    return u.astype(np.float32)
+
+
+def get_folded_user_vector(weights, model_key, user_id, item_idx, ratings):
+    """fold_in_user avec cache LRU ; recalculé seulement si les notes de l'utilisateur changent"""
+    item_idx = np.asarray(item_idx, dtype=np.int64)
+    ratings = np.asarray(ratings, dtype=np.float32)
+    fingerprint = hashlib.sha1(item_idx.tobytes() + ratings.tobytes()).hexdigest()
+    key = (model_key, user_id, fingerprint)
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    user_vec = fold_in_user(weights, item_idx, ratings)
+
+    with _cache_lock:
+        _cache[key] = user_vec
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return user_vec
@@ -0,0 +1,71 @@
+import os
+import json
+import time
+import shutil
+
+MODELS_DIR = "models"
+VERSIONS_DIR = os.path.join(MODELS_DIR, "versions")
+CURRENT_FILE = os.path.join(MODELS_DIR, "current.json")
+
+
+def current_model_info():
+    """Infos du modèle publié ({"version", "path", ...}), ou le modèle historique de models/"""
+    if os.path.exists(CURRENT_FILE):
+        with open(CURRENT_FILE, "r") as f:
+            return json.load(f)
+    return {"version": "base", "path": MODELS_DIR, "n_new_ratings": 0}
+
+
+def current_model_dir():
+    return current_model_info()["path"]
+
+
+def current_model_version():
+    return current_model_info()["version"]
+
+
+def new_staging_dir():
+    """Dossier temporaire (sur le même disque que versions/) où entraîner un nouveau modèle"""
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    staging = os.path.join(VERSIONS_DIR, f".staging-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(staging)
+    return staging
+
+
+def publish_model(staging_dir, keep=3):
+    """Publier atomiquement un modèle entraîné dans staging_dir.
+
+    Le dossier est renommé en versions/<version>, puis current.json est remplacé
+    via un fichier temporaire + os.replace : un lecteur voit toujours soit
+    l'ancienne version complète, soit la nouvelle.
+    """
+    version = time.strftime("%Y%m%d-%H%M%S") + f"-{time.time_ns() % 1_000_000:06d}"
+    final_dir = os.path.join(VERSIONS_DIR, version)
+    os.rename(staging_dir, final_dir)
+
+    info = {"version": version, "path": final_dir}
+    metadata_path = os.path.join(final_dir, "metadata.json")
+    if os.path.exists(metadata_path):
+        with open(metadata_path, "r") as f:
+            info.update(json.load(f))
+
+    tmp_file = f"{CURRENT_FILE}.{os.getpid()}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(info, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, CURRENT_FILE)
+
+    prune_versions(keep)
+    return info
+
+
+def prune_versions(keep=3):
+    """Supprimer les anciennes versions en gardant les `keep` plus récentes et la version courante"""
+    if not os.path.isdir(VERSIONS_DIR):
+        return
+    current = current_model_version()
+    versions = sorted(d for d in os.listdir(VERSIONS_DIR) if not d.startswith("."))
+    for version in versions[:-keep]:
+        if version != current:
+            shutil.rmtree(os.path.join(VERSIONS_DIR, version), ignore_errors=True)
@@ -0,0 +1,384 @@
+import os
+import sys
+import json
+import shutil
+import numpy as np
+from quantization import QuantizedTable, quantize
+
+# Couches Keras que le scoreur sait rejouer en NumPy (mode inférence)
+SUPPORTED_LAYERS = {"InputLayer", "Embedding", "Flatten", "Concatenate", "Dense",
+                    "BatchNormalization", "Dropout", "Dot", "RatingScaler"}
+GRAPH_KEY = "__graph__"
+MANIFEST_FILE = "manifest.json"
+# Films traités par bloc quand les tables quantifiées sont déquantifiées à la volée
+ITEM_BATCH_SIZE = 4096
+
+
+def activate(z, activation):
+    if activation == "relu":
+        return np.maximum(z, 0)
+    if activation == "linear":
+        return z
+    if activation == "sigmoid":
+        return 1 / (1 + np.exp(-z))
+    raise ValueError(f"Activation non supportée : {activation}")
+
+
+def model_arrays(model):
+    """Graphe (couches, entrées, hyperparamètres utiles) et poids d'un modèle Keras fonctionnel.
+
+    Chaque poids est rangé sous "<couche>/<i>", le graphe en JSON sous GRAPH_KEY.
+    """
+    config = model.get_config()
+    layers = []
+    arrays = {}
+    for layer_config in config["layers"]:
+        name = layer_config["name"]
+        if layer_config["class_name"] not in SUPPORTED_LAYERS:
+            raise ValueError(f"Couche non supportée : {layer_config['class_name']} ({name})")
+        # Noms des couches qui alimentent celle-ci (chaque couche n'est appelée qu'une fois)
+        inbound = []
+        for node in layer_config["inbound_nodes"]:
+            args = node["args"][0]
+            for tensor in (args if isinstance(args, list) else [args]):
+                inbound.append(tensor["config"]["keras_history"][0])
+        params = {key: value for key, value in layer_config["config"].items()
+                  if key in ("activation", "axis", "axes", "normalize", "epsilon", "center", "scale",
+                             "min_rating", "max_rating")}
+        layers.append({"name": name, "class_name": layer_config["class_name"],
+                       "inbound": inbound, "config": params})
+        for i, weight in enumerate(model.get_layer(name).get_weights()):
+            arrays[f"{name}/{i}"] = weight.astype(np.float32)
+
+    # Une seule sortie : [nom, 0, 0] pour un modèle juste construit, [[nom, 0, 0]] une fois rechargé
+    outputs = config["output_layers"]
+    graph = {
+        "layers": layers,
+        "inputs": [name for name, _, _ in config["input_layers"]],
+        "output": outputs[0] if isinstance(outputs[0], str) else outputs[0][0],
+    }
+    arrays[GRAPH_KEY] = np.array(json.dumps(graph))
+    return arrays
+
+
+def export_model(model, path, quantization=None):
+    """Écrire les poids du modèle, rechargeables sans Keras par load_scorer :
+    un .npz, ou un dossier mappable en mémoire (export_arrays) pour tout autre chemin"""
+    if path.endswith(".npz"):
+        np.savez(path, **model_arrays(model))
+    else:
+        export_arrays(model_arrays(model), path, quantization=quantization)
+
+
+def export_arrays(arrays, directory, precompute_items=True, quantization=None):
+    """Un .npy par tenseur + manifest.json, que load_scorer ouvre en memmap (lecture seule).
+
+    Tous les processus qui chargent le même dossier partagent alors les mêmes
+    pages du cache disque au lieu d'avoir chacun leur copie des poids. Avec
+    `precompute_items`, les nœuds qui ne dépendent que du film (tour film,
+    part film de la première Dense) sont calculés ici une fois et stockés
+    aussi. `quantization` ("float16" ou "int8", voir quantization.py) stocke
+    les tables d'Embedding quantifiées ; rien n'est alors précalculé, le
+    scoreur déquantifie les films par blocs à chaque requête. Le dossier est
+    écrit à côté puis mis en place par renommage.
+    """
+    tmp_dir = f"{directory}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    manifest = {"graph": json.loads(str(arrays[GRAPH_KEY])), "tensors": {}, "item_cache": {}}
+    embeddings = {f"{layer['name']}/0" for layer in manifest["graph"]["layers"] if layer["class_name"] == "Embedding"}
+    tensors = [(key, value) for key, value in arrays.items() if key != GRAPH_KEY]
+    for i, (key, value) in enumerate(tensors):
+        if quantization is not None and key in embeddings:
+            values, scales = quantize(value, quantization)
+            entry = _save_tensor(tmp_dir, f"tensor_{i}.npy", values)
+            entry["quantization"] = quantization
+            if scales is not None:
+                entry["scales"] = _save_tensor(tmp_dir, f"tensor_{i}_scales.npy", scales)["file"]
+            manifest["tensors"][key] = entry
+        else:
+            manifest["tensors"][key] = _save_tensor(tmp_dir, f"tensor_{i}.npy", value)
+
+    if precompute_items and quantization is None:
+        scorer = NumpyScorer(arrays)
+        scorer.score_user(0)
+        weights = [w for ws in scorer.weights.values() for w in ws]
+        # Seuls les nœuds film lus par un nœud utilisateur servent à la requête
+        frontier = {n for layer in scorer.layers.values() if scorer._sides[layer["name"]] != {"item"}
+                    for n in layer["inbound"]}
+        for i, (node, value) in enumerate(scorer._item_cache.items()):
+            if "<-" not in node and node not in frontier:
+                continue
+            # Une vue d'une table de poids est déjà dans le dossier
+            if not any(np.shares_memory(value, w) for w in weights):
+                manifest["item_cache"][node] = _save_tensor(tmp_dir, f"item_cache_{i}.npy", value)
+
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    # Les processus qui ont mappé l'ancienne version la gardent jusqu'à leur rechargement
+    old_dir = f"{directory}.{os.getpid()}.old"
+    if os.path.exists(directory):
+        os.rename(directory, old_dir)
+    os.rename(tmp_dir, directory)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _save_tensor(directory, filename, value):
+    value = np.ascontiguousarray(value)
+    np.save(os.path.join(directory, filename), value)
+    return {"file": filename, "dtype": str(value.dtype), "shape": list(value.shape)}
+
+
+def load_scorer(path):
+    """Scoreur d'un export : dossier avec manifest.json (memmap partagé) ou .npz (copie en mémoire)"""
+    if os.path.isdir(path):
+        with open(os.path.join(path, MANIFEST_FILE), "r") as f:
+            manifest = json.load(f)
+        arrays = {}
+        for key, entry in manifest["tensors"].items():
+            arrays[key] = np.load(os.path.join(path, entry["file"]), mmap_mode="r")
+            if "quantization" in entry:
+                scales = np.load(os.path.join(path, entry["scales"]), mmap_mode="r") if "scales" in entry else None
+                arrays[key] = QuantizedTable(arrays[key], scales)
+        arrays[GRAPH_KEY] = json.dumps(manifest["graph"])
+        scorer = NumpyScorer(arrays)
+        scorer._item_cache.update({node: np.load(os.path.join(path, entry["file"]), mmap_mode="r")
+                                   for node, entry in manifest["item_cache"].items()})
+        return scorer
+    with np.load(path) as arrays:
+        return NumpyScorer({key: arrays[key] for key in arrays.files})
+
+
+class NumpyScorer:
+    """Passe avant d'un modèle Keras exporté (MLP, NCF, two-tower), en NumPy pur.
+
+    Les entrées du graphe sont [utilisateur, film]. score_user note un
+    utilisateur face à tous les films d'un coup : les nœuds qui ne dépendent
+    que du film (embeddings, tour film, et la part film de la première Dense
+    après une concaténation) sont calculés une fois puis gardés en cache, il
+    ne reste par requête qu'une matmul (n_films x d) par couche côté utilisateur.
+    """
+
+    def __init__(self, arrays):
+        graph = json.loads(str(arrays[GRAPH_KEY]))
+        self.layers = {layer["name"]: layer for layer in graph["layers"]}
+        self.inputs = graph["inputs"]
+        self.output = graph["output"]
+        self.weights = {name: [] for name in self.layers}
+        for key, value in arrays.items():
+            if key != GRAPH_KEY:
+                name, i = key.rsplit("/", 1)
+                self.weights[name].append((int(i), value))
+        self.weights = {name: [w for _, w in sorted(values, key=lambda x: x[0])]
+                        for name, values in self.weights.items()}
+
+        # BatchNormalization en inférence = transformation affine fixe
+        self._affine = {}
+        for name, layer in self.layers.items():
+            if layer["class_name"] == "BatchNormalization":
+                self._affine[name] = self._batch_norm_affine(layer, self.weights[name])
+
+        # Côté (utilisateur / film) dont dépend chaque nœud
+        self._sides = {}
+        for name in self.layers:
+            self._side_of(name)
+        self.user_embedding = self._embedding_after(self.inputs[0])
+        self.item_embedding = self._embedding_after(self.inputs[1])
+        self.num_users = len(self.weights[self.user_embedding][0])
+        self.num_items = len(self.weights[self.item_embedding][0])
+        self.quantized = any(isinstance(w, QuantizedTable) for ws in self.weights.values() for w in ws)
+        self._item_cache = {}
+
+    @classmethod
+    def from_keras(cls, model):
+        return cls(model_arrays(model))
+
+    @staticmethod
+    def _batch_norm_affine(layer, weights):
+        config = layer["config"]
+        weights = list(weights)
+        gamma = weights.pop(0) if config.get("scale", True) else 1.0
+        beta = weights.pop(0) if config.get("center", True) else 0.0
+        mean, var = weights
+        scale = gamma / np.sqrt(var + config.get("epsilon", 1e-3))
+        return scale.astype(np.float32), (beta - mean * scale).astype(np.float32)
+
+    def _side_of(self, name):
+        if name not in self._sides:
+            if name == self.inputs[0]:
+                self._sides[name] = {"user"}
+            elif name == self.inputs[1]:
+                self._sides[name] = {"item"}
+            else:
+                self._sides[name] = set().union(*(self._side_of(n) for n in self.layers[name]["inbound"]))
+        return self._sides[name]
+
+    def _embedding_after(self, input_name):
+        for name, layer in self.layers.items():
+            if layer["class_name"] == "Embedding" and layer["inbound"] == [input_name]:
+                return name
+        raise ValueError(f"Aucun Embedding branché sur l'entrée {input_name}")
+
+    def _evaluate(self, name, feeds, values, use_cache):
+        """Valeur du nœud `name`, calculée à la demande (et mémorisée dans `values`)"""
+        if name in values:
+            return values[name]
+        cached = use_cache and self._sides[name] == {"item"}
+        if cached and name in self._item_cache:
+            return self._item_cache[name]
+
+        layer = self.layers[name]
+        kind = layer["class_name"]
+        config = layer["config"]
+        weights = self.weights[name]
+        inputs = layer["inbound"]
+
+        if kind == "InputLayer":
+            value = feeds[name]
+        elif kind == "Embedding" and cached:
+            # Tous les films dans l'ordre : la table elle-même, sans copie
+            value = weights[0]
+        elif kind == "Embedding":
+            value = weights[0][self._evaluate(inputs[0], feeds, values, use_cache)]
+        elif kind == "Flatten":
+            value = self._evaluate(inputs[0], feeds, values, use_cache)
+            value = value.reshape(len(value), -1)
+        elif kind == "Concatenate":
+            parts = [self._evaluate(n, feeds, values, use_cache) for n in inputs]
+            batch = max(len(p) for p in parts)
+            value = np.concatenate([np.broadcast_to(p, (batch,) + p.shape[1:]) for p in parts],
+                                   axis=config.get("axis", -1))
+        elif kind == "Dense":
+            value = activate(self._dense(name, feeds, values, use_cache) + weights[1], config["activation"])
+        elif kind == "BatchNormalization":
+            scale, shift = self._affine[name]
+            value = self._evaluate(inputs[0], feeds, values, use_cache) * scale + shift
+        elif kind == "Dropout":
+            value = self._evaluate(inputs[0], feeds, values, use_cache)
+        elif kind == "Dot":
+            a, b = (self._evaluate(n, feeds, values, use_cache) for n in inputs)
+            if config.get("normalize"):
+                a = a / np.linalg.norm(a, axis=-1, keepdims=True)
+                b = b / np.linalg.norm(b, axis=-1, keepdims=True)
+            if len(a) == 1 and len(b) > 1:
+                value = (b @ a[0])[:, None]
+            elif len(b) == 1 and len(a) > 1:
+                value = (a @ b[0])[:, None]
+            else:
+                value = np.sum(a * b, axis=-1, keepdims=True)
+        elif kind == "RatingScaler":
+            value = (self._evaluate(inputs[0], feeds, values, use_cache)
+                     * (config["max_rating"] - config["min_rating"]) + config["min_rating"])
+        else:
+            raise ValueError(f"Couche non supportée : {kind} ({name})")
+
+        if cached:
+            self._item_cache[name] = value
+        values[name] = value
+        return value
+
+    def _dense(self, name, feeds, values, use_cache):
+        """x @ kernel ; après une concaténation, le noyau est découpé par entrée
+        pour que la part film (constante) soit calculée une seule fois"""
+        kernel = self.weights[name][0]
+        source = self.layers[name]["inbound"][0]
+        if self.layers[source]["class_name"] != "Concatenate":
+            return self._evaluate(source, feeds, values, use_cache) @ kernel
+
+        total, offset = 0, 0
+        for part in self.layers[source]["inbound"]:
+            x = self._evaluate(part, feeds, values, use_cache)
+            width = x.shape[-1]
+            key = f"{name}<-{part}"
+            if use_cache and self._sides[part] == {"item"}:
+                if key not in self._item_cache:
+                    self._item_cache[key] = x @ kernel[offset:offset + width]
+                total = total + self._item_cache[key]
+            else:
+                total = total + x @ kernel[offset:offset + width]
+            offset += width
+        return total
+
+    def predict(self, user_idx, item_idx):
+        """Notes prévues pour des couples (utilisateur, film), comme model.predict([users, items])"""
+        user_idx = np.asarray(user_idx, dtype=np.int64).reshape(-1)
+        item_idx = np.asarray(item_idx, dtype=np.int64).reshape(-1)
+        feeds = {self.inputs[0]: user_idx, self.inputs[1]: item_idx}
+        return self._evaluate(self.output, feeds, {}, use_cache=False)[:, 0]
+
+    def node_value(self, name, user_idx=None, user_vector=None, item_idx=None):
+        """Sortie du nœud `name` pour un utilisateur (index encodé, ou vecteur replié via
+        `user_vector`) face aux films `item_idx`, ou à tous les films du modèle si None"""
+        if item_idx is None and self.quantized and "item" in self._sides[name]:
+            # Tables quantifiées : tous les films par blocs, sans déquantifier la table entière
+            return np.concatenate([
+                self.node_value(name, user_idx, user_vector, np.arange(start, min(start + ITEM_BATCH_SIZE, self.num_items)))
+                for start in range(0, self.num_items, ITEM_BATCH_SIZE)])
+        values = {}
+        if user_vector is not None:
+            values[self.user_embedding] = np.asarray(user_vector, dtype=np.float32).reshape(1, 1, -1)
+            user_idx = 0
+        use_cache = item_idx is None
+        if use_cache:
+            item_idx = np.arange(self.num_items)
+        feeds = {self.inputs[0]: np.array([user_idx or 0], dtype=np.int64),
+                 self.inputs[1]: np.asarray(item_idx, dtype=np.int64)}
+        return self._evaluate(name, feeds, values, use_cache)
+
+    def score_user(self, user_idx=None, user_vector=None, item_idx=None):
+        """Notes prévues d'un utilisateur pour les films `item_idx` (tous si None)"""
+        return self.node_value(self.output, user_idx, user_vector, item_idx)[:, 0]
+
+    def towers(self):
+        """(nœud utilisateur, nœud film) du produit scalaire final d'un modèle two-tower"""
+        for name, layer in self.layers.items():
+            if layer["class_name"] == "Dot":
+                a, b = layer["inbound"]
+                if self._sides[a] == {"user"} and self._sides[b] == {"item"}:
+                    return a, b
+                if self._sides[a] == {"item"} and self._sides[b] == {"user"}:
+                    return b, a
+        raise ValueError("Le modèle n'a pas de produit scalaire entre une tour utilisateur et une tour film")
+
+    def _tower_vectors(self, vectors):
+        dot = next(layer for layer in self.layers.values() if layer["class_name"] == "Dot")
+        if dot["config"].get("normalize"):
+            vectors = vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors
+
+    def user_tower(self, user_idx=None, user_vector=None):
+        """Vecteur de la tour utilisateur (float32, une ligne)"""
+        return self._tower_vectors(self.node_value(self.towers()[0], user_idx, user_vector))[0]
+
+    def item_tower(self):
+        """Vecteurs de la tour film pour tous les films (float32, n_films x d)"""
+        return np.ascontiguousarray(self._tower_vectors(self.node_value(self.towers()[1])), dtype=np.float32)
+
+    def mlp_weights(self):
+        """Poids au format de fold_in (embeddings + couches Dense dans l'ordre du graphe)"""
+        dense = [(self.weights[name][0], self.weights[name][1], layer["config"]["activation"])
+                 for name, layer in self.layers.items() if layer["class_name"] == "Dense"]
+        return {"user_embedding": self.weights[self.user_embedding][0],
+                "item_embedding": self.weights[self.item_embedding][0],
+                "dense": dense}
+
+
+if __name__ == "__main__":
+    # python numpy_scorer.py models/mlp_model.keras [sortie.npz | dossier [float16 | int8]]
+    # (un .npz existant peut aussi être converti en dossier mappable, éventuellement quantifié)
+    model_path = sys.argv[1]
+    out_path = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(model_path)[0] + ".npz"
+    quantization = sys.argv[3] if len(sys.argv) > 3 else None
+    if quantization is not None and out_path.endswith(".npz"):
+        raise SystemExit("La quantification ne s'applique qu'à un export en dossier")
+    if model_path.endswith(".npz"):
+        with np.load(model_path) as data:
+            arrays = {key: data[key] for key in data.files}
+        if out_path.endswith(".npz"):
+            np.savez(out_path, **arrays)
+        else:
+            export_arrays(arrays, out_path, quantization=quantization)
+    else:
+        from tensorflow.keras.models import load_model
+        export_model(load_model(model_path), out_path, quantization)
+    print(f"✅ Poids exportés dans {out_path}")
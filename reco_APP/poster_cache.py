@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import fcntl
+import atexit
+import threading
+from collections import OrderedDict
+import database
+
+
+class JsonPosterStore:
+    """poster_cache.json : {titre: url, ou {"poster": null, "checked_at": ...} si pas d'affiche}"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, limit):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        return dict(list(entries.items())[-limit:])
+
+    def get_many(self, titles):
+        # Tout le fichier (dans la limite du LRU) est déjà en mémoire
+        return {}
+
+    def save(self, entries):
+        """Fusionner `entries` dans le fichier : écriture dans un temporaire puis os.replace"""
+        with open(f"{self.path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            stored = {}
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+            stored.update(entries)
+            tmp_file = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(stored, f, ensure_ascii=False)
+            os.replace(tmp_file, self.path)
+
+
+class SqlitePosterStore:
+    """Table posters de la base SQLite : une écriture ne touche que les titres modifiés"""
+
+    def load(self, limit):
+        return database.read_posters(limit)
+
+    def get_many(self, titles):
+        return database.get_posters(titles)
+
+    def save(self, entries):
+        database.put_posters(entries)
+
+
+def _entry(value):
+    """(url ou None, checked_at) depuis une valeur stockée"""
+    if isinstance(value, str):
+        return value, None
+    # Ancien format : null, sans date (considéré comme expiré)
+    return None, value.get("checked_at", 0) if isinstance(value, dict) else 0
+
+
+def _value(url, checked_at):
+    return url if url else {"poster": None, "checked_at": checked_at}
+
+
+class PosterCache:
+    """Cache d'affiches du processus : LRU borné en mémoire, persistance différée.
+
+    Les lectures ne touchent que la mémoire (plus, avec le stockage SQLite,
+    une requête groupée pour les titres sortis du LRU). Les écritures sont
+    regroupées : la première programme une sauvegarde `flush_delay` secondes
+    plus tard, qui écrit d'un coup tout ce qui a changé entre-temps.
+    """
+
+    def __init__(self, store, max_entries=5000, flush_delay=5.0):
+        self.store = store
+        self.max_entries = max_entries
+        self.flush_delay = flush_delay
+        self._entries = OrderedDict()   # titre -> (url ou None, checked_at)
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._timer = None
+        for title, value in store.load(max_entries).items():
+            self._entries[title] = _entry(value)
+        atexit.register(self.flush)
+
+    def get_many(self, titles, negative_ttl, now=None):
+        """{titre: url ou None} des titres connus ; une absence d'affiche expirée compte comme inconnue"""
+        now = now or time.time()
+        entries = {}
+        with self._lock:
+            for title in titles:
+                if title in self._entries:
+                    self._entries.move_to_end(title)
+                    entries[title] = self._entries[title]
+        missing = [title for title in titles if title not in entries]
+        if missing:
+            loaded = {title: _entry(value) for title, value in self.store.get_many(missing).items()}
+            with self._lock:
+                for title, entry in loaded.items():
+                    self._set(title, entry)
+            entries.update(loaded)
+
+        return {title: url for title, (url, checked_at) in entries.items()
+                if url or now - checked_at < negative_ttl}
+
+    def put_many(self, posters, now=None):
+        """Enregistrer {titre: url ou None} ; la sauvegarde suit au plus tard dans flush_delay secondes"""
+        now = now or time.time()
+        with self._lock:
+            for title, url in posters.items():
+                self._set(title, (url, None if url else now))
+                self._dirty[title] = _value(url, now)
+            if self._dirty and self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _set(self, title, entry):
+        self._entries[title] = entry
+        self._entries.move_to_end(title)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if dirty:
+            try:
+                self.store.save(dirty)
+            except Exception:
+                # On retentera à la prochaine sauvegarde
+                with self._lock:
+                    self._dirty = {**dirty, **self._dirty}
+                raise
+
+    def __len__(self):
+        return len(self._entries)
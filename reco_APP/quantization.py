@@ -0,0 +1,55 @@
+import numpy as np
+
+# Formats de stockage des tables d'Embedding
+QUANTIZATIONS = ("float16", "int8")
+
+
+def quantize(table, quantization):
+    """(valeurs, échelles) d'une table float32 : float16 tel quel (échelles None), ou int8
+    avec une échelle par ligne (max |x| / 127) pour garder la précision des petites lignes"""
+    table = np.asarray(table, dtype=np.float32)
+    if quantization == "float16":
+        return table.astype(np.float16), None
+    if quantization == "int8":
+        scales = np.abs(table).max(axis=1) / 127
+        scales[scales == 0] = 1
+        values = np.clip(np.round(table / scales[:, None]), -127, 127).astype(np.int8)
+        return values, scales.astype(np.float32)
+    raise ValueError(f"Quantification inconnue : {quantization} (attendu : {', '.join(QUANTIZATIONS)})")
+
+
+class QuantizedTable:
+    """Table d'Embedding quantifiée, déquantifiée à la lecture des seules lignes demandées.
+
+    table[idx] rend des lignes float32 comme un tableau NumPy ; la table
+    complète n'est jamais reconstruite en mémoire.
+    """
+
+    def __init__(self, values, scales=None):
+        self.values = values
+        self.scales = scales
+        self.shape = values.shape
+        self.dtype = np.dtype(np.float32)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, idx):
+        rows = self.values[idx].astype(np.float32)
+        if self.scales is not None:
+            scales = self.scales[idx]
+            rows *= scales[..., None] if np.ndim(scales) else scales
+        return rows
+
+    def mean(self, axis=0, batch_size=4096):
+        """Moyenne des lignes (seul axis=0 est géré), déquantifiées par blocs"""
+        if axis != 0:
+            raise ValueError("QuantizedTable.mean ne gère que axis=0")
+        total = np.zeros(self.shape[1], dtype=np.float64)
+        for start in range(0, len(self), batch_size):
+            total += self[start:start + batch_size].sum(axis=0)
+        return (total / len(self)).astype(np.float32)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + (0 if self.scales is None else self.scales.nbytes)
@@ -1,71 +1,21 @@
 import streamlit as st
-import pandas as pd
-import os
-from sklearn.preprocessing import LabelEncoder
-import joblib
-import subprocess
+from reco_core.dataset_cache import load_movies as load_movie_table
+from database import add_rating
+from training_scheduler import get_training_scheduler
+from result_cache import get_recommendation_cache
 
 @st.cache_data
 def load_movies():
-    return pd.read_csv("data/u.item", sep="|", encoding="latin-1", header=None, usecols=[0, 1], names=["movie_id", "title"])
-
-@st.cache_data
-def load_ratings():
-    return pd.read_csv("data/new_ratings.csv") if os.path.exists("data/new_ratings.csv") else pd.DataFrame(columns=["user_id", "movie_id", "rating", "user_idx", "item_idx"])
+    return load_movie_table("data/u.item", columns=["movie_id", "title"])
 
 def save_rating(user_id, movie_id, rating):
-    import subprocess
-
-    # Charger les anciennes notations
-    ratings = load_ratings()
-
-    # Charger les encodeurs
-    user_enc = joblib.load("models/user_encoder.pkl")
-    item_enc = joblib.load("models/item_encoder.pkl")
-
-    try:
-        # Essayer d'encoder normalement
-        user_idx = user_enc.transform([user_id])[0]
-        item_idx = item_enc.transform([movie_id])[0]
-    except ValueError:
-        # Mettre à jour les encodeurs si user_id ou movie_id inconnus
-        new_user_ids = list(user_enc.classes_)
-        if user_id not in new_user_ids:
-            new_user_ids.append(user_id)
-        user_enc.fit(new_user_ids)
-
-        new_movie_ids = list(item_enc.classes_)
-        if movie_id not in new_movie_ids:
-            new_movie_ids.append(movie_id)
-        item_enc.fit(new_movie_ids)
-
-        # Refaire l'encodage
-        user_idx = user_enc.transform([user_id])[0]
-        item_idx = item_enc.transform([movie_id])[0]
-
-        # Sauvegarder les encodeurs mis à jour
-        joblib.dump(user_enc, "models/user_encoder.pkl")
-        joblib.dump(item_enc, "models/item_encoder.pkl")
-
-    # Supprimer les notations en doublon (même user_id et movie_id)
-    ratings = ratings.drop(ratings[(ratings["user_id"] == user_id) & (ratings["movie_id"] == movie_id)].index)
-
-    # Ajouter la nouvelle notation
-    new_entry = pd.DataFrame([{
-        "user_id": user_id,
-        "movie_id": movie_id,
-        "rating": rating,
-        "user_idx": user_idx,
-        "item_idx": item_idx
-    }])
-    ratings = pd.concat([ratings, new_entry], ignore_index=True)
-
-    # Sauvegarder dans le fichier
-    ratings.to_csv("data/new_ratings.csv", index=False)
+    # Une note plus ancienne sur le même film est remplacée
+    add_rating(user_id, movie_id, rating)
 
-    # 🔁 Réentraîner le modèle
-    #with st.spinner("🔄 Mise à jour du modèle..."):
-     #   subprocess.run(["python", "train_mlp_model.py"], check=True)
+    # 🔁 Le modèle sera réentraîné en arrière-plan quand assez de notes seront arrivées
+    get_training_scheduler().notify_new_ratings(1)
+    # Les recommandations en cache de cet utilisateur ne sont plus à jour
+    get_recommendation_cache().invalidate_user(user_id)
 
     st.success("🎉 Film noté avec succès !")
 
@@ -1,54 +1,25 @@
 import streamlit as st
-import pandas as pd
-import os
-import csv
-from sklearn.preprocessing import LabelEncoder
-from login_page import load_users
-from login_page import load_users, save_users
+from database import add_ratings, set_initial_ratings_done
+from reco_core.dataset_cache import load_ratings, load_movies
+from training_scheduler import get_training_scheduler
+from result_cache import get_recommendation_cache
 
 
 @st.cache_data
 def load_data():
-    ratings = pd.read_csv("data/u.data", sep="\t", names=["user_id", "movie_id", "rating", "timestamp"])
-    movies = pd.read_csv("data/u.item", sep="|", encoding="latin-1", header=None, usecols=[0, 1], names=["movie_id", "title"])
+    ratings = load_ratings("data/u.data")
+    movies = load_movies("data/u.item", columns=["movie_id", "title"])
     return ratings, movies
 
 def save_user_ratings(user_id, user_ratings):
-    # Charger les anciennes notations MovieLens
-    ratings_df = pd.read_csv("data/u.data", sep="\t", names=["user_id", "movie_id", "rating", "timestamp"])
-    
-    # Charger les notations existantes si elles existent
-    new_ratings_path = "data/new_ratings.csv"
-    if os.path.exists(new_ratings_path):
-        try:
-            new_ratings_df = pd.read_csv(new_ratings_path)
-        except pd.errors.EmptyDataError:
-            new_ratings_df = pd.DataFrame(columns=["user_id", "movie_id", "rating"])
+    # Ajouter les nouvelles notations de l'utilisateur (une seule transaction)
+    new_entries = [(user_id, int(mid), float(r)) for mid, r in user_ratings.items() if r > 0]
+    add_ratings(new_entries)
 
-        ratings_df = pd.concat([ratings_df, new_ratings_df[["user_id", "movie_id", "rating"]]], ignore_index=True)
-
-    # Ajouter les nouvelles notations de l'utilisateur
-    new_entries = [{"user_id": user_id, "movie_id": int(mid), "rating": float(r)} for mid, r in user_ratings.items() if r > 0]
-    new_df = pd.DataFrame(new_entries)
-    ratings_df = pd.concat([ratings_df, new_df], ignore_index=True)
-
-    # Encodage des user_id et movie_id
-    user_enc = LabelEncoder()
-    item_enc = LabelEncoder()
-    ratings_df["user_idx"] = user_enc.fit_transform(ratings_df["user_id"])
-    ratings_df["item_idx"] = item_enc.fit_transform(ratings_df["movie_id"])
-
-    # Isoler les nouvelles notations avec leurs index encodés
-    new_df = ratings_df[ratings_df["user_id"] == user_id][["user_id", "movie_id", "rating", "user_idx", "item_idx"]]
-
-    # Enregistrer dans new_ratings.csv
-    if os.path.exists(new_ratings_path):
-        existing = pd.read_csv(new_ratings_path)
-        combined = pd.concat([existing, new_df], ignore_index=True).drop_duplicates(subset=["user_id", "movie_id"])
-    else:
-        combined = new_df
-
-    combined.to_csv(new_ratings_path, index=False)
+    # 🔁 Prévenir le planificateur d'entraînement (réentraînement en arrière-plan)
+    get_training_scheduler().notify_new_ratings(len(new_entries))
+    # Les recommandations en cache de cet utilisateur ne sont plus à jour
+    get_recommendation_cache().invalidate_user(user_id)
 
 def show_rating_page():
     st.title("🎥 Notation initiale")
@@ -80,12 +51,8 @@ def show_rating_page():
             user_id = st.session_state["user_id"]
             save_user_ratings(user_id, st.session_state.user_ratings)
             st.session_state["initial_ratings_done"] = True
-            # ✅ Mettre à jour users.json pour persister cette info
-            users = load_users()
-            username = st.session_state["username"]
-            if username in users:
-                users[username]["initial_ratings_done"] = True
-                save_users(users)
+            # ✅ Persister cette info dans la base
+            set_initial_ratings_done(st.session_state["username"])
             
     else:
         st.warning("⛔ Veuillez noter au moins 5 films.")
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+def _lookup_table(keys, values, fill):
+    """Tableau indexé par clé (id brut positif) : table[key] = value, `fill` ailleurs"""
+    table = np.full(int(keys.max()) + 1 if len(keys) else 0, fill, dtype=values.dtype)
+    table[keys] = values
+    return table
+
+
+class RatingsIndex:
+    """Notes triées par utilisateur (décalages façon CSR) et tables film -> index / titre.
+
+    Construit une fois par version des notes et du modèle : les notes d'un
+    utilisateur sont une tranche contiguë, retrouvée par recherche binaire,
+    et la correspondance movie_id -> item_idx ou titre est un simple accès
+    à un tableau, sans filtrer le DataFrame à chaque appel.
+    """
+
+    def __init__(self, ratings, movies):
+        user_ids = ratings["user_id"].to_numpy(np.int64)
+        order = np.argsort(user_ids, kind="stable")
+        self.user_ids, starts = np.unique(user_ids[order], return_index=True)
+        self.offsets = np.append(starts, len(order))
+        self.movie_ids = ratings["movie_id"].to_numpy(np.int64)[order]
+        self.ratings = ratings["rating"].to_numpy(np.float32)[order]
+        self.item_idx = ratings["item_idx"].to_numpy(np.int64)[order]
+        self.user_idx = ratings["user_idx"].to_numpy(np.int64)[order][starts]
+
+        # movie_id -> item_idx (-1 si le modèle ne connaît pas le film)
+        known = self.item_idx >= 0
+        self.movie_to_item = _lookup_table(self.movie_ids[known], self.item_idx[known], -1)
+        # Films notés connus du modèle, candidats quand tout le catalogue est noté
+        self.catalog_movie_ids = np.unique(self.movie_ids[known])
+        self.catalog_items = self.movie_to_item[self.catalog_movie_ids]
+        self.num_items = int(self.item_idx.max()) + 1 if len(self.item_idx) else 0
+
+        movie_ids = movies["movie_id"].to_numpy(np.int64)
+        self.titles = _lookup_table(movie_ids, movies["title"].to_numpy(dtype=object), None)
+
+    def user(self, user_id):
+        """(position dans user_ids, début, fin) des notes de l'utilisateur, None s'il n'a aucune note"""
+        pos = np.searchsorted(self.user_ids, user_id)
+        if pos == len(self.user_ids) or self.user_ids[pos] != user_id:
+            return None
+        return pos, self.offsets[pos], self.offsets[pos + 1]
+
+    def items_of(self, movie_ids):
+        """item_idx de chaque movie_id (vectorisé), -1 pour les films inconnus du modèle"""
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        in_range = (movie_ids >= 0) & (movie_ids < len(self.movie_to_item))
+        return np.where(in_range, self.movie_to_item[np.where(in_range, movie_ids, 0)], -1)
+
+    def title(self, movie_id):
+        if 0 <= movie_id < len(self.titles) and self.titles[movie_id] is not None:
+            return self.titles[movie_id]
+        return f"Film {movie_id}"
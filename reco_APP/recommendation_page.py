@@ -1,85 +1,151 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from tensorflow.keras.models import load_model
-from sklearn.preprocessing import LabelEncoder
-import subprocess
-import joblib
-from tmdb_utils import get_movie_poster
-
-
-@st.cache_resource
+import os
+import time
+from tmdb_utils import get_movie_posters
+from model_registry import current_model_info
+from training_scheduler import get_training_scheduler
+from result_cache import get_recommendation_cache
+from database import read_new_ratings, ratings_version, user_ratings_version
+from reco_core.dataset_cache import load_ratings, load_movies
+from reco_core.id_map import load_model_id_maps
+from ratings_index import RatingsIndex
+from fold_in import get_folded_user_vector
+from numpy_scorer import NumpyScorer, load_scorer
+from candidate_generators import (ItemNeighborsGenerator, PopularityGenerator, TwoTowerGenerator,
+                                  generate_candidates, use_two_stage, CANDIDATE_SIZES)
+
+
+@st.cache_resource(max_entries=2)
 def load_mlp_model(path="models/mlp_model.keras"):
+    # TensorFlow n'est importé que pour un modèle sans export NumPy
+    from tensorflow.keras.models import load_model
     return load_model(path)
 
-@st.cache_data
-def load_ratings_and_movies():
-    import joblib
+@st.cache_resource(max_entries=2)
+def load_mlp_scorer(model_dir="models"):
+    """Scoreur NumPy du modèle : dossier mlp_model/ mappé en mémoire (partagé entre
+    processus), sinon mlp_model.npz, sinon poids extraits du .keras"""
+    for path in (os.path.join(model_dir, "mlp_model"), os.path.join(model_dir, "mlp_model.npz")):
+        if os.path.exists(path):
+            return load_scorer(path)
+    return NumpyScorer.from_keras(load_mlp_model(os.path.join(model_dir, "mlp_model.keras")))
+
+def new_ratings_version():
+    return ratings_version()
+
+# La clé de cache change avec la version du modèle et avec chaque écriture de notes
+@st.cache_data(max_entries=4)
+def load_ratings_and_movies(model_dir="models", ratings_version=0):
 
     # Charger u.data
-    df_base = pd.read_csv("data/u.data", sep="\t", names=["user_id", "movie_id", "rating", "timestamp"])
-    df_base = df_base[["user_id", "movie_id", "rating"]]
+    df_base = load_ratings("data/u.data", columns=["user_id", "movie_id", "rating"])
 
     # Charger les nouvelles notations
-    df_new = pd.read_csv("data/new_ratings.csv")[["user_id", "movie_id", "rating"]]
+    df_new = read_new_ratings()[["user_id", "movie_id", "rating"]]
     ratings = pd.concat([df_base, df_new], ignore_index=True)
 
     # Charger les encodages identiques à ceux du modèle
-    user_enc = joblib.load("models/user_encoder.pkl")
-    item_enc = joblib.load("models/item_encoder.pkl")
+    # (les notes arrivées depuis le dernier entraînement restent à -1)
+    user_map, item_map = load_model_id_maps(model_dir)
 
-    ratings["user_idx"] = user_enc.transform(ratings["user_id"])
-    ratings["item_idx"] = item_enc.transform(ratings["movie_id"])
+    ratings["user_idx"] = user_map.transform(ratings["user_id"].values)
+    ratings["item_idx"] = item_map.transform(ratings["movie_id"].values)
 
     # Charger les titres de films
-    movies = pd.read_csv("data/u.item", sep="|", encoding="latin-1", header=None, usecols=[0, 1], names=["movie_id", "title"])
+    movies = load_movies("data/u.item", columns=["movie_id", "title"])
 
     return ratings, movies
 
 
-def get_user_predictions(model, user_id, ratings, movies, top_n=10):
-    user_idx = ratings[ratings["user_id"] == user_id]["user_idx"].iloc[0]
-
-    # Films déjà notés
-    rated_movies = ratings[ratings["user_id"] == user_id]["movie_id"].unique()
-
-    # 🔁 Prendre tous les films présents dans le dataset ratings (ceux encodés)
-    all_movies = ratings["movie_id"].unique()
-    unrated_movies = np.setdiff1d(all_movies, rated_movies)
-
-    # Mapping ID → item_idx (encodé)
-    movie_id_to_idx = ratings[["movie_id", "item_idx"]].drop_duplicates().set_index("movie_id")["item_idx"].to_dict()
-    movie_id_to_title = movies.set_index("movie_id")["title"].to_dict()
+@st.cache_resource(max_entries=2)
+def load_ratings_index(model_dir="models", ratings_version=0):
+    ratings, movies = load_ratings_and_movies(model_dir, ratings_version)
+    return RatingsIndex(ratings, movies)
 
-    # Créer les couples (movie_id, item_idx) seulement pour ceux qu’on connaît
-    candidates = [(mid, movie_id_to_idx[mid]) for mid in unrated_movies if mid in movie_id_to_idx]
 
-    if not candidates:
+@st.cache_resource
+def load_two_tower_generator():
+    return TwoTowerGenerator()
+
+# Voisins et popularité construits une fois par version du modèle (avec les notes du
+# moment) : une note écrite ne relance pas le calcul des voisins, seul un nouveau modèle
+# publié le fait. Two-tower chargé une seule fois.
+@st.cache_resource(max_entries=2)
+def load_candidate_generators(model_dir="models"):
+    ratings, _ = load_ratings_and_movies(model_dir, new_ratings_version())
+    return {
+        "item_cf": ItemNeighborsGenerator(ratings),
+        "two_tower": load_two_tower_generator(),
+        "popularity": PopularityGenerator(ratings),
+    }
+
+
+def get_user_predictions(scorer, user_id, index, top_n=10, model_key=None,
+                         generators=None, candidate_sizes=None, timings=None):
+    """Top-N (titre, note prévue), ou None si l'utilisateur n'a aucune note exploitable.
+
+    `index` est le RatingsIndex des notes (load_ratings_index). Sans
+    `generators`, tous les films sont notés d'un coup par le scoreur NumPy.
+    Avec, le calcul se fait en deux étapes : les générateurs rapides
+    (candidate_generators) proposent quelques centaines de candidats, que le
+    MLP re-classe seuls. Un utilisateur absent du modèle (inscrit depuis le
+    dernier entraînement) est « replié » : son vecteur est estimé à partir de
+    ses notes avant le calcul. `timings` reçoit la durée (ms) de chaque étape.
+    """
+    timings = {} if timings is None else timings
+    user = index.user(user_id)
+    if user is None:
+        return None
+    pos, begin, end = user
+    user_idx = index.user_idx[pos]
+    rated_movies, rated_values = index.movie_ids[begin:end], index.ratings[begin:end]
+    rated_items = index.item_idx[begin:end]
+
+    user_vec = None
+    if user_idx < 0:
+        known = rated_items >= 0
+        if not known.any():
+            return None
+        start = time.perf_counter()
+        user_vec = get_folded_user_vector(scorer.mlp_weights(), model_key, user_id,
+                                          rated_items[known], rated_values[known])
+        timings["fold_in"] = 1000 * (time.perf_counter() - start)
+
+    if generators:
+        # 1️⃣ Génération de candidats
+        start = time.perf_counter()
+        candidate_movies = generate_candidates(generators, user_id, rated_movies, rated_values,
+                                               candidate_sizes, timings)
+        candidate_items = index.items_of(candidate_movies)
+        timings["candidates"] = 1000 * (time.perf_counter() - start)
+    else:
+        # 🔁 Tous les films présents dans les notes et connus du modèle
+        candidate_movies, candidate_items = index.catalog_movie_ids, index.catalog_items
+
+    # Garder les films connus du modèle et pas encore notés (masques booléens)
+    rated_mask = np.zeros(max(index.num_items, 1), dtype=bool)
+    rated_mask[rated_items[rated_items >= 0]] = True
+    keep = candidate_items >= 0
+    keep[keep] = ~rated_mask[candidate_items[keep]]
+    candidate_movies, candidate_items = candidate_movies[keep], candidate_items[keep]
+    if len(candidate_items) == 0:
         return []
 
-    X_user = np.array([user_idx] * len(candidates)).reshape(-1, 1)
-    X_item = np.array([item_idx for _, item_idx in candidates]).reshape(-1, 1)
-
-    predictions = model.predict([X_user, X_item], verbose=0).flatten()
-    top_indices = predictions.argsort()[-top_n:][::-1]
-
-    # Exclure les films déjà notés (au cas où le modèle les recommande quand même)
-    rated_movie_ids = ratings[ratings["user_id"] == user_id]["movie_id"].astype(int).tolist()
-
-    top_movie_ids = []
-    top_titles = []
+    # 2️⃣ Notation MLP : seulement les candidats, ou tous les films d'un coup (cache côté films)
+    start = time.perf_counter()
+    if generators:
+        predictions = scorer.score_user(user_idx, user_vector=user_vec, item_idx=candidate_items)
+    else:
+        predictions = scorer.score_user(user_idx, user_vector=user_vec)[candidate_items]
+    timings["rerank"] = 1000 * (time.perf_counter() - start)
 
-    results = []
-    for i in top_indices:
-        movie_id = candidates[i][0]
-        if movie_id not in rated_movie_ids:
-            title = movie_id_to_title.get(movie_id, f"Film {movie_id}")
-            score = float(f"{predictions[i]:.2f}")
-            results.append((title, score))
-        if len(results) >= top_n:
-            break
-
-    return results
+    # Top-N sans trier tous les candidats
+    n = min(top_n, len(predictions))
+    top = np.argpartition(-predictions, n - 1)[:n]
+    top = top[np.argsort(-predictions[top], kind="stable")]
+    return [(index.title(candidate_movies[i]), float(f"{predictions[i]:.2f}")) for i in top]
 
 def show_recommendation_page():
     st.title("🎯 Vos recommandations personnalisées")
@@ -89,27 +155,63 @@ def show_recommendation_page():
     if st.button("Générer mes recommandations"):
         user_id = st.session_state["user_id"]
 
+        scheduler = get_training_scheduler()
+        cache = get_recommendation_cache()
+        timings = {}
+        from_cache = False
+
+        # ✅ Toujours servir la dernière version publiée, l'entraînement se fait en arrière-plan
+        model_info = current_model_info()
+        model_dir, model_version = model_info["path"], model_info["version"]
+
         try:
-            # 🔁 (Ré)entraîner le modèle à chaque clic
-            with st.spinner("🔄 Entraînement du modèle MLP en cours..."):
-                subprocess.run(["python", "train_mlp_model.py"], check=True)
-                st.cache_data.clear()
-                st.cache_resource.clear()
-
-            # ✅ Charger le modèle mis à jour
-            model = load_mlp_model()
-            ratings, movies = load_ratings_and_movies()
-
-            recommendations = get_user_predictions(model, user_id, ratings, movies, top_n)
-            if recommendations:
+            # Résultat déjà calculé pour cet utilisateur, ce modèle, ses notes actuelles et ce top_n ?
+            user_version = user_ratings_version(user_id)
+            recommendations = cache.get(user_id, model_version, user_version, top_n)
+            from_cache = recommendations is not None
+            if not from_cache:
+                scorer = load_mlp_scorer(model_dir)
+                version = new_ratings_version()
+                index = load_ratings_index(model_dir, version)
+                # Grand catalogue : candidats rapides puis re-classement MLP ; sinon tous les films notés.
+                # Les nouveaux utilisateurs passent par fold-in dans les deux cas
+                generators, candidate_sizes = None, None
+                if use_two_stage(index.num_items):
+                    generators = load_candidate_generators(model_dir)
+                    candidate_sizes = CANDIDATE_SIZES
+                recommendations = get_user_predictions(scorer, user_id, index, top_n, model_key=model_dir,
+                                                       generators=generators, candidate_sizes=candidate_sizes,
+                                                       timings=timings)
+                if recommendations is not None:
+                    cache.put(user_id, model_version, user_version, top_n, recommendations)
+
+            if recommendations is None:
+                scheduler.request_training()
+                st.info("⏳ Votre profil est en cours d'intégration au modèle. Réessayez dans quelques instants.")
+            elif recommendations:
                 username = st.session_state.get("username", "utilisateur")
                 st.success(f"Voici vos recommandations personnalisées, {username} 🎬")
+                # Toutes les affiches d'un coup (requêtes TMDB en parallèle)
+                start = time.perf_counter()
+                posters = get_movie_posters([title for title, _ in recommendations])
+                timings["posters"] = 1000 * (time.perf_counter() - start)
                 for i, (title, score) in enumerate(recommendations, 1):
                     st.markdown(f"**{i}. {title} — Note prévue : ⭐ {score}/5**")
-                    poster_url = get_movie_poster(title)
+                    poster_url = posters[title]
                     if poster_url:
                         st.image(poster_url, width=150)
             else:
                 st.warning("Aucune recommandation possible : tous les films sont déjà notés.")
         except Exception as e:
-            st.error(f"Erreur pendant la prédiction : {e}")
\ No newline at end of file
+            st.error(f"Erreur pendant la prédiction : {e}")
+
+        status = f"Modèle : version {model_version}"
+        if from_cache:
+            status += " — résultat en cache"
+        elif timings:
+            status += " — " + ", ".join(f"{stage} {ms:.1f} ms" for stage, ms in timings.items())
+        stats = cache.stats()
+        status += f" — cache : {stats['hits']} hits / {stats['misses']} misses"
+        if scheduler.is_training:
+            status += " — mise à jour en cours en arrière-plan"
+        st.caption(status)
@@ -0,0 +1,84 @@
+import time
+import threading
+from collections import OrderedDict
+import streamlit as st
+
+
+class RecommendationCache:
+    """Cache LRU + TTL des top-N calculés, clé (user_id, version du modèle,
+    version des notes de l'utilisateur, top_n).
+
+    Une nouvelle note de l'utilisateur (écrite par n'importe quel processus,
+    voir database.user_ratings_version) ou une nouvelle version du modèle
+    change la clé : les anciennes entrées ne sont plus lues et sortent par
+    LRU ou TTL. invalidate_user les libère tout de suite dans le processus
+    qui a écrit la note, sans toucher aux autres utilisateurs.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()   # clé -> (expire_at, valeur)
+        self._by_user = {}              # user_id -> clés de cet utilisateur
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id, model_version, ratings_version, top_n):
+        key = (user_id, model_version, ratings_version, top_n)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, model_version, ratings_version, top_n, value):
+        key = (user_id, model_version, ratings_version, top_n)
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        """Oublier tous les résultats d'un utilisateur (à appeler après chaque note écrite)"""
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+            }
+
+
+@st.cache_resource
+def get_recommendation_cache():
+    """Cache unique par processus Streamlit, partagé par toutes les sessions"""
+    return RecommendationCache()
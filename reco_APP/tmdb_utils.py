@@ -1,43 +1,118 @@
 import requests
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from poster_cache import PosterCache, JsonPosterStore, SqlitePosterStore
+from reco_core.dataset_cache import load_ratings, load_movies
 
 TMDB_API_KEY = "c369d81884c2220f96b0175ea53b8f87"
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+# Surchargeable pour pointer vers un serveur local (fake_tmdb_server)
+TMDB_BASE_URL = os.environ.get("TMDB_BASE_URL", "https://api.themoviedb.org/3")
 TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/w500"
 
 # Dossier cache pour éviter de faire trop d'appels API
 CACHE_FILE = "data/poster_cache.json"
+# "json" (CACHE_FILE) ou "sqlite" (table posters de la base de l'application)
+CACHE_BACKEND = os.environ.get("POSTER_CACHE_BACKEND", "json")
+CACHE_MAX_ENTRIES = 5000
+CACHE_FLUSH_DELAY = 5.0
+# Affiches préchargées au démarrage (films les plus notés)
+WARM_UP_TOP_N = 200
 
-import json
-def load_cache():
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+# Requêtes parallèles, délai max (connexion, lecture) et durée de vie d'un « pas d'affiche »
+MAX_WORKERS = 8
+REQUEST_TIMEOUT = (3.05, 5)
+NEGATIVE_TTL_SECONDS = 7 * 24 * 3600
 
-def save_cache(cache):
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(cache, f, ensure_ascii=False, indent=2)
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+_cache_lock = threading.Lock()
+_warm_up_thread = None
+
+def get_session():
+    """Session HTTP partagée : connexions keep-alive réutilisées par tous les threads"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def get_poster_cache():
+    """Cache d'affiches unique par processus (chargé une fois, puis lu en mémoire)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            store = SqlitePosterStore() if CACHE_BACKEND == "sqlite" else JsonPosterStore(CACHE_FILE)
+            _cache = PosterCache(store, max_entries=CACHE_MAX_ENTRIES, flush_delay=CACHE_FLUSH_DELAY)
+        return _cache
 
-def get_movie_poster(title):
-    cache = load_cache()
-    if title in cache:
-        return cache[title]
 
+def fetch_poster(title, session=None, timeout=REQUEST_TIMEOUT):
+    """(réponse valide, url ou None) : une erreur réseau ou HTTP n'est pas une absence d'affiche"""
     params = {
         "api_key": TMDB_API_KEY,
         "query": title
     }
-    response = requests.get(f"{TMDB_BASE_URL}/search/movie", params=params)
-
-    if response.status_code == 200:
-        results = response.json().get("results")
-        if results and results[0].get("poster_path"):
-            poster_url = TMDB_IMAGE_BASE + results[0]["poster_path"]
-            cache[title] = poster_url
-            save_cache(cache)
-            return poster_url
-
-    cache[title] = None
-    save_cache(cache)
-    return None
+    try:
+        response = (session or get_session()).get(f"{TMDB_BASE_URL}/search/movie", params=params, timeout=timeout)
+    except requests.RequestException:
+        return False, None
+
+    if response.status_code != 200:
+        return False, None
+    results = response.json().get("results")
+    if results and results[0].get("poster_path"):
+        return True, TMDB_IMAGE_BASE + results[0]["poster_path"]
+    return True, None
+
+
+def get_movie_posters(titles, max_workers=MAX_WORKERS, timeout=REQUEST_TIMEOUT, cache=None):
+    """{titre: url ou None} pour tous les titres.
+
+    Les titres absents du cache (ou dont l'absence d'affiche a expiré) sont
+    demandés à TMDB en parallèle sur la session partagée, puis enregistrés
+    ensemble dans le cache du processus. Une erreur réseau ou un délai
+    dépassé rend None sans rien mettre en cache : le titre sera redemandé
+    au prochain appel. `cache` remplace le cache du processus.
+    """
+    cache = get_poster_cache() if cache is None else cache
+    titles = list(dict.fromkeys(titles))
+    posters = cache.get_many(titles, NEGATIVE_TTL_SECONDS)
+    missing = [title for title in titles if title not in posters]
+
+    if missing:
+        session = get_session()
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+            fetched = list(pool.map(lambda title: fetch_poster(title, session, timeout), missing))
+        for title, (ok, url) in zip(missing, fetched):
+            posters[title] = url
+        cache.put_many({title: url for title, (ok, url) in zip(missing, fetched) if ok})
+    return posters
+
+
+def get_movie_poster(title):
+    return get_movie_posters([title])[title]
+
+
+def popular_titles(n=WARM_UP_TOP_N):
+    """Titres des n films les plus notés de u.data"""
+    counts = load_ratings("data/u.data", columns=["movie_id"])["movie_id"].value_counts()
+    movies = load_movies("data/u.item", columns=["movie_id", "title"]).set_index("movie_id")["title"]
+    return [str(movies[movie_id]) for movie_id in counts.index[:n] if movie_id in movies.index]
+
+
+def start_poster_warm_up(n=WARM_UP_TOP_N):
+    """Précharger en arrière-plan les affiches des films populaires (une seule fois par processus)"""
+    global _warm_up_thread
+    with _cache_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=lambda: get_movie_posters(popular_titles(n)),
+                                               name="poster-warm-up", daemon=True)
+            _warm_up_thread.start()
+        return _warm_up_thread
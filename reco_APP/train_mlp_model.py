@@ -1,76 +1,291 @@
 import pandas as pd
 import numpy as np
 import os
-from sklearn.preprocessing import LabelEncoder
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, Embedding, Dot, Flatten
+import json
+import time
+import argparse
+import tensorflow as tf
+from tensorflow.keras.models import Model, load_model
+from tensorflow.keras.layers import Input, Embedding, Flatten, Dense, Dropout, Concatenate
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.losses import MeanSquaredError
-import subprocess
+from tensorflow.keras.callbacks import Callback, EarlyStopping
+from numpy_scorer import export_model
+from database import read_new_ratings
+from reco_core.dataset_cache import load_ratings
+from reco_core.id_map import IdMap, save_model_id_maps, load_model_id_maps
 
-# 📥 1. Charger les données
-df_base = pd.read_csv("data/u.data", sep="\t", names=["user_id", "movie_id", "rating", "timestamp"])
-df_base = df_base[["user_id", "movie_id", "rating"]]
+# Copie des nouvelles notes vues par un modèle, pour calculer le delta au prochain entraînement
+SNAPSHOT_FILE = "trained_new_ratings.csv"
 
-# Vérifier si des nouvelles notations existent
-if os.path.exists("data/new_ratings.csv"):
-    df_new = pd.read_csv("data/new_ratings.csv")[["user_id", "movie_id", "rating"]]
+# Taux d'apprentissage de référence (Adam) pour des lots de BASE_BATCH_SIZE notes
+BASE_LEARNING_RATE = 0.001
+BASE_BATCH_SIZE = 64
+# Part des notes gardée de côté pour l'arrêt anticipé, et epochs sans progrès tolérées
+VALIDATION_SPLIT = 0.1
+PATIENCE = 2
+
+
+def load_training_data():
+    # 📥 1. Charger les données
+    df_base = load_ratings("data/u.data", columns=["user_id", "movie_id", "rating"])
+
+    # Nouvelles notations (base SQLite, une note par utilisateur et par film)
+    df_new = read_new_ratings()[["user_id", "movie_id", "rating"]]
     df = pd.concat([df_base, df_new], ignore_index=True)
-else:
-    df = df_base
+    return df, df_new
+
+
+def scaled_learning_rate(batch_size, base_lr=BASE_LEARNING_RATE, base_batch_size=BASE_BATCH_SIZE):
+    """Taux d'apprentissage pour des lots plus gros : racine du rapport des tailles (règle usuelle avec Adam)"""
+    return base_lr * np.sqrt(batch_size / base_batch_size)
+
+
+def make_dataset(X_user, X_item, y, batch_size, shuffle=True, seed=42):
+    """Entrée tf.data : notes gardées en cache, mélangées à chaque epoch, lots préparés pendant le calcul"""
+    dataset = tf.data.Dataset.from_tensor_slices(
+        ((np.asarray(X_user, dtype=np.int64), np.asarray(X_item, dtype=np.int64)),
+         np.asarray(y, dtype=np.float32))).cache()
+    if shuffle:
+        dataset = dataset.shuffle(len(y), seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+class ThroughputLogger(Callback):
+    """Durée et notes traitées par seconde à chaque epoch (ajoutées aux logs sous `samples_per_sec`)"""
+
+    def __init__(self, n_samples):
+        super().__init__()
+        self.n_samples = n_samples
+        self.history = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._start
+        self.history.append(self.n_samples / elapsed)
+        if logs is not None:
+            logs["samples_per_sec"] = self.history[-1]
+        print(f"Epoch {epoch + 1} : {elapsed:.1f} s | {self.history[-1]:,.0f} samples/sec")
+
+
+def fit_model(model, X_user, X_item, y, epochs, batch_size, validation_split=VALIDATION_SPLIT,
+              patience=PATIENCE, seed=42, verbose=2, validation_rows=None):
+    """Entraîner sur un pipeline tf.data, avec arrêt anticipé sur `validation_split` des notes.
+
+    Les notes de validation sont tirées au hasard une fois pour toutes, parmi
+    les lignes `validation_rows` seulement (toutes si None) : les autres
+    servent toujours à l'entraînement. L'entraînement s'arrête après
+    `patience` epochs sans baisse de la perte de validation et garde les
+    meilleurs poids. Sans validation (`validation_split=0`), toutes les
+    epochs sont faites.
+    Rend un résumé (epochs faites, RMSE de validation, débit moyen).
+    """
+    X_user, X_item, y = np.asarray(X_user), np.asarray(X_item), np.asarray(y, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    rows = np.arange(len(y)) if validation_rows is None else np.asarray(validation_rows)
+    n_val = min(int(len(y) * validation_split), len(rows))
+    val = rng.permutation(rows)[:n_val]
+    is_val = np.zeros(len(y), dtype=bool)
+    is_val[val] = True
+    fit = np.flatnonzero(~is_val)
+
+    throughput = ThroughputLogger(len(fit))
+    callbacks = [throughput]
+    validation = None
+    if n_val:
+        validation = make_dataset(X_user[val], X_item[val], y[val], batch_size, shuffle=False)
+        callbacks.append(EarlyStopping(monitor="val_loss", patience=patience, restore_best_weights=True))
+
+    history = model.fit(make_dataset(X_user[fit], X_item[fit], y[fit], batch_size, seed=seed),
+                        validation_data=validation, epochs=epochs, callbacks=callbacks, shuffle=False,
+                        verbose=verbose)
+
+    summary = {"epochs_trained": len(history.history["loss"]), "batch_size": batch_size,
+               "samples_per_sec": float(np.mean(throughput.history))}
+    if n_val:
+        summary["val_rmse"] = float(np.sqrt(min(history.history["val_loss"])))
+    return summary
+
+
+def build_model(num_users, num_items, embedding_size=50, learning_rate=BASE_LEARNING_RATE):
+    user_input = Input(shape=(1,), name="user_input")
+    item_input = Input(shape=(1,), name="item_input")
+
+    user_embedding = Embedding(input_dim=num_users, output_dim=embedding_size)(user_input)
+    item_embedding = Embedding(input_dim=num_items, output_dim=embedding_size)(item_input)
+
+    user_vec = Flatten()(user_embedding)
+    item_vec = Flatten()(item_embedding)
+
+    concat = Concatenate()([user_vec, item_vec])
+
+    x = Dense(128, activation="relu")(concat)
+    x = Dropout(0.2)(x)
+    x = Dense(64, activation="relu")(x)
+    x = Dropout(0.2)(x)
+
+    output = Dense(1)(x)
+
+    model = Model(inputs=[user_input, item_input], outputs=output)
+    model.compile(optimizer=Adam(learning_rate), loss=MeanSquaredError(), metrics=["mae"])
+    return model
+
+
+def save_model(output_dir, model, user_map, item_map, df, df_new, **extra):
+    os.makedirs(output_dir, exist_ok=True)
+    model.save(os.path.join(output_dir, "mlp_model.keras"))
+    # Poids en NumPy pour le service (numpy_scorer), sans passer par Keras,
+    # un .npy par tenseur que les processus du serveur mappent en mémoire
+    export_model(model, os.path.join(output_dir, "mlp_model"))
+    save_model_id_maps(output_dir, user_map, item_map)
+    df_new.to_csv(os.path.join(output_dir, SNAPSHOT_FILE), index=False)
+
+    metadata = {
+        "trained_at": time.time(),
+        "n_ratings": len(df),
+        "n_new_ratings": len(df_new),
+        "num_users": len(user_map),
+        "num_items": len(item_map),
+        **extra,
+    }
+    with open(os.path.join(output_dir, "metadata.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+
+    print(f"✅ Modèle MLP sauvegardé dans {output_dir}/mlp_model.keras")
+    return metadata
+
+
+def train(output_dir="models", epochs=30, batch_size=1024, learning_rate=None,
+          validation_split=VALIDATION_SPLIT, patience=PATIENCE):
+    """Entraînement complet. `learning_rate` par défaut : scaled_learning_rate(batch_size).
+    `epochs` est un maximum, l'arrêt anticipé coupe dès que la validation ne progresse plus."""
+    df, df_new = load_training_data()
+
+    # 🔁 2. Encoder les ID
+    user_map = IdMap.fit(df["user_id"])
+    item_map = IdMap.fit(df["movie_id"])
+    df["user_idx"] = user_map.transform(df["user_id"])
+    df["item_idx"] = item_map.transform(df["movie_id"])
+
+    num_users = len(user_map)
+    num_items = len(item_map)
+
+    print(f"Training MLP model on {len(df)} ratings | {num_users} users | {num_items} items")
+
+    # 🧠 3. Construire et entraîner
+    learning_rate = learning_rate or scaled_learning_rate(batch_size)
+    model = build_model(num_users, num_items, learning_rate=learning_rate)
+
+    X_user = df["user_idx"].values
+    X_item = df["item_idx"].values
+    y = df["rating"].values
 
-# 🔁 2. Encoder les ID
-user_enc = LabelEncoder()
-item_enc = LabelEncoder()
-df["user_idx"] = user_enc.fit_transform(df["user_id"])
-df["item_idx"] = item_enc.fit_transform(df["movie_id"])
+    # Validation tirée de u.data seulement : les nouvelles notes (celles qui ont
+    # déclenché l'entraînement) sont toutes apprises
+    summary = fit_model(model, X_user, X_item, y, epochs, batch_size,
+                        validation_split=validation_split, patience=patience,
+                        validation_rows=np.arange(len(df) - len(df_new)))
 
-num_users = df["user_idx"].nunique()
-num_items = df["item_idx"].nunique()
+    # 💾 4. Sauvegarder
+    return save_model(output_dir, model, user_map, item_map, df, df_new, incremental_runs=0,
+                      learning_rate=learning_rate, **summary)
 
-print(f"Training MLP model on {len(df)} ratings | {num_users} users | {num_items} items")
 
-from tensorflow.keras.layers import Flatten, Dense, Dropout, Concatenate
+def grow_embedding(old_table, num_rows, old_positions, rng):
+    """Table agrandie : anciennes lignes recopiées à leur nouvelle position, nouvelles lignes aléatoires"""
+    table = rng.uniform(-0.05, 0.05, size=(num_rows, old_table.shape[1])).astype(old_table.dtype)
+    table[old_positions] = old_table
+    return table
 
-embedding_size = 50
 
-user_input = Input(shape=(1,), name="user_input")
-item_input = Input(shape=(1,), name="item_input")
+def read_snapshot(base_dir):
+    path = os.path.join(base_dir, SNAPSHOT_FILE)
+    if os.path.exists(path):
+        return pd.read_csv(path)[["user_id", "movie_id", "rating"]].drop_duplicates()
+    return pd.DataFrame({"user_id": pd.Series(dtype="int64"),
+                         "movie_id": pd.Series(dtype="int64"),
+                         "rating": pd.Series(dtype="float64")})
 
-user_embedding = Embedding(input_dim=num_users, output_dim=embedding_size)(user_input)
-item_embedding = Embedding(input_dim=num_items, output_dim=embedding_size)(item_input)
 
-user_vec = Flatten()(user_embedding)
-item_vec = Flatten()(item_embedding)
+def train_incremental(base_dir, output_dir, epochs=2, batch_size=64, replay_ratio=4,
+                      min_replay=1024, learning_rate=0.0005, seed=42):
+    """Affiner un modèle existant sur les nouvelles notes seulement.
 
-concat = Concatenate()([user_vec, item_vec])
+    Les nouveaux ids sont ajoutés à la fin des IdMap du modèle de base (les
+    anciens index ne bougent pas) et les tables d'Embedding sont agrandies
+    d'autant en gardant les anciennes lignes, puis le modèle est entraîné quelques epochs sur le delta
+    (notes absentes du modèle de base) plus un échantillon de rejeu tiré de
+    tout le corpus. Le coût suit la taille du delta, pas celle du corpus.
+    """
+    rng = np.random.default_rng(seed)
+    df, df_new = load_training_data()
 
-x = Dense(128, activation="relu")(concat)
-x = Dropout(0.2)(x)
-x = Dense(64, activation="relu")(x)
-x = Dropout(0.2)(x)
+    base_model = load_model(os.path.join(base_dir, "mlp_model.keras"))
+    user_map, item_map = load_model_id_maps(base_dir)
+    user_positions, item_positions = np.arange(len(user_map)), np.arange(len(item_map))
+    user_map.add(df["user_id"])
+    item_map.add(df["movie_id"])
 
-output = Dense(1)(x)
+    # 🧩 Même architecture, tables agrandies, couches denses recopiées
+    base_embeddings = [layer for layer in base_model.layers if isinstance(layer, Embedding)]
+    embedding_size = base_embeddings[0].get_weights()[0].shape[1]
+    model = build_model(len(user_map), len(item_map), embedding_size, learning_rate=learning_rate)
 
-model = Model(inputs=[user_input, item_input], outputs=output)
+    embeddings = [layer for layer in model.layers if isinstance(layer, Embedding)]
+    for layer, base_layer, positions in zip(embeddings, base_embeddings, [user_positions, item_positions]):
+        table = grow_embedding(base_layer.get_weights()[0], layer.input_dim, positions, rng)
+        layer.set_weights([table])
+    dense_layers = [layer for layer in model.layers if isinstance(layer, Dense)]
+    base_dense_layers = [layer for layer in base_model.layers if isinstance(layer, Dense)]
+    for layer, base_layer in zip(dense_layers, base_dense_layers):
+        layer.set_weights(base_layer.get_weights())
 
-model.compile(optimizer=Adam(0.001), loss=MeanSquaredError(), metrics=["mae"])
+    # 🆕 Delta = nouvelles notes absentes de la copie gardée avec le modèle de base
+    seen = df_new.merge(read_snapshot(base_dir), how="left", indicator=True)
+    delta = seen[seen["_merge"] == "left_only"][["user_id", "movie_id", "rating"]]
 
-# 🧠 4. Entraîner
-X_user = df["user_idx"].values
-X_item = df["item_idx"].values
-y = df["rating"].values
+    n_replay = min(len(df), max(min_replay, replay_ratio * len(delta)))
+    replay = df.iloc[rng.choice(len(df), size=n_replay, replace=False)]
+    batch = pd.concat([delta, replay], ignore_index=True).sample(frac=1, random_state=seed)
 
-model.fit([X_user, X_item], y, batch_size=64, epochs=5, verbose=1)
+    print(f"Fine-tuning MLP model on {len(delta)} new + {len(replay)} replayed ratings "
+          f"| {len(user_map)} users | {len(item_map)} items")
 
-# 💾 5. Sauvegarder
-os.makedirs("models", exist_ok=True)
-model.save("models/mlp_model.keras")
+    X_user = user_map.transform(batch["user_id"])
+    X_item = item_map.transform(batch["movie_id"])
+    y = batch["rating"].values.astype(np.float32)
+    # Peu de notes : pas de validation, les quelques epochs demandées sont toutes faites
+    summary = fit_model(model, X_user, X_item, y, epochs, batch_size, validation_split=0, seed=seed)
 
-print("✅ Modèle MLP sauvegardé dans models/mlp_model.keras")
+    base_runs = 0
+    if os.path.exists(os.path.join(base_dir, "metadata.json")):
+        with open(os.path.join(base_dir, "metadata.json"), "r") as f:
+            base_runs = json.load(f).get("incremental_runs", 0)
+    return save_model(output_dir, model, user_map, item_map, df, df_new,
+                      incremental_runs=base_runs + 1, n_delta_ratings=len(delta), **summary)
 
 
-import joblib
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entraîner le modèle MLP de recommandation")
+    parser.add_argument("--output-dir", default="models", help="Dossier où écrire le modèle et les encodeurs")
+    parser.add_argument("--epochs", type=int, default=None,
+                        help="Par défaut 30 au plus avec arrêt anticipé (complet) ou 2 (--incremental)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Par défaut 1024 (complet) ou 64 (--incremental)")
+    parser.add_argument("--learning-rate", type=float, default=None,
+                        help="Par défaut mis à l'échelle de la taille des lots (entraînement complet)")
+    parser.add_argument("--validation-split", type=float, default=VALIDATION_SPLIT,
+                        help="Part des notes gardée pour l'arrêt anticipé (0 : pas d'arrêt anticipé)")
+    parser.add_argument("--patience", type=int, default=PATIENCE)
+    parser.add_argument("--incremental", action="store_true",
+                        help="Affiner le modèle de --base-dir sur les nouvelles notes au lieu de repartir de zéro")
+    parser.add_argument("--base-dir", default="models", help="Modèle de départ pour --incremental")
+    args = parser.parse_args()
 
-joblib.dump(user_enc, "models/user_encoder.pkl")
-joblib.dump(item_enc, "models/item_encoder.pkl")
+    if args.incremental:
+        train_incremental(args.base_dir, args.output_dir, epochs=args.epochs or 2, batch_size=args.batch_size or 64,
+                          learning_rate=args.learning_rate or 0.0005)
+    else:
+        train(args.output_dir, epochs=args.epochs or 30, batch_size=args.batch_size or 1024,
+              learning_rate=args.learning_rate, validation_split=args.validation_split, patience=args.patience)
@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import queue
+import shutil
+import fcntl
+import threading
+import subprocess
+import streamlit as st
+import model_registry
+from database import count_ratings
+
+TRAIN_LOCK_FILE = os.path.join(model_registry.MODELS_DIR, ".train.lock")
+
+
+def count_new_ratings():
+    return count_ratings()
+
+
+class TrainingScheduler:
+    """Réentraîne le MLP en arrière-plan (thread + file de tâches).
+
+    Un entraînement est lancé quand au moins `min_new_ratings` nouvelles notes
+    se sont accumulées, quand des notes attendent depuis plus de
+    `max_wait_seconds`, ou sur demande explicite. Les entraînements affinent
+    le modèle courant sur le delta (train_mlp_model.py --incremental), avec un
+    réentraînement complet toutes les `full_retrain_every` fois. Chacun tourne
+    dans un sous-processus qui écrit dans un dossier de staging, publié
+    ensuite de façon atomique par model_registry. Les pages lisent toujours la
+    dernière version prête, sans jamais attendre. Après un échec, aucun
+    entraînement n'est relancé avant `retry_after_seconds`, sauf si de
+    nouvelles notes sont arrivées entre-temps.
+    """
+
+    def __init__(self, min_new_ratings=20, max_wait_seconds=600, poll_seconds=30, full_retrain_every=10,
+                 retry_after_seconds=600):
+        self.min_new_ratings = min_new_ratings
+        self.full_retrain_every = full_retrain_every
+        self.max_wait_seconds = max_wait_seconds
+        self.poll_seconds = poll_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.is_training = False
+        self.last_error = None
+        self.last_failed_at = None
+        self._pending_at_failure = 0
+        self._requested = False
+        self.pending = max(0, count_new_ratings() - model_registry.current_model_info().get("n_new_ratings", 0))
+        self._first_pending_at = time.time() if self.pending else None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="mlp-training", daemon=True)
+            self._thread.start()
+        return self
+
+    def notify_new_ratings(self, count=1):
+        """À appeler après chaque écriture de notes"""
+        with self._lock:
+            self.pending += count
+            if self._first_pending_at is None:
+                self._first_pending_at = time.time()
+            ready = self.pending >= self.min_new_ratings
+        if ready:
+            self._jobs.put("threshold")
+
+    def request_training(self):
+        """Demander un entraînement dès que possible (ex. utilisateur inconnu du modèle)"""
+        with self._lock:
+            self._requested = True
+        self._jobs.put("requested")
+
+    def _should_train(self):
+        with self._lock:
+            if (self.last_failed_at is not None and self.pending <= self._pending_at_failure
+                    and time.time() - self.last_failed_at < self.retry_after_seconds):
+                return False
+            if self._requested:
+                return True
+            if self.pending >= self.min_new_ratings:
+                return True
+            return self.pending > 0 and time.time() - self._first_pending_at >= self.max_wait_seconds
+
+    def _run(self):
+        while True:
+            try:
+                self._jobs.get(timeout=self.poll_seconds)
+            except queue.Empty:
+                pass
+            try:
+                if self._should_train():
+                    self._train()
+            except Exception as e:
+                # Le thread ne doit jamais mourir : l'erreur est gardée et retentée plus tard
+                self.is_training = False
+                self._record_failure(repr(e))
+
+    def _record_failure(self, message):
+        self.last_error = message
+        with self._lock:
+            self.last_failed_at = time.time()
+            self._pending_at_failure = self.pending
+
+    def _train(self):
+        os.makedirs(model_registry.MODELS_DIR, exist_ok=True)
+        with open(TRAIN_LOCK_FILE, "w") as lock_file:
+            try:
+                # Un seul entraînement à la fois, même avec plusieurs processus Streamlit
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+
+            with self._lock:
+                trained_pending = self.pending
+                self._requested = False
+            self.is_training = True
+            staging = None
+            try:
+                staging = model_registry.new_staging_dir()
+                command = [sys.executable, "train_mlp_model.py", "--output-dir", staging]
+                current = model_registry.current_model_info()
+                if (os.path.exists(os.path.join(current["path"], "mlp_model.keras"))
+                        and current.get("incremental_runs", 0) < self.full_retrain_every):
+                    command += ["--incremental", "--base-dir", current["path"]]
+                subprocess.run(command, check=True, capture_output=True)
+                model_registry.publish_model(staging)
+                with self._lock:
+                    self.pending -= trained_pending
+                    self._first_pending_at = time.time() if self.pending else None
+                self.last_error = None
+                self.last_failed_at = None
+            except Exception as e:
+                if staging is not None:
+                    shutil.rmtree(staging, ignore_errors=True)
+                self._record_failure(e.stderr.decode(errors="replace")[-2000:] if getattr(e, "stderr", None)
+                                     else str(e))
+            finally:
+                self.is_training = False
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@st.cache_resource
+def get_training_scheduler():
+    """Planificateur unique par processus Streamlit"""
+    return TrainingScheduler().start()
@@ -0,0 +1 @@
+"""Modules partagés par l'application (reco_APP) et les scripts de code/"""
@@ -0,0 +1,134 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+CACHE_DIRNAME = ".npy_cache"
+
+MOVIE_COLUMNS = ["movie_id", "title", "release_date", "video_release", "imdb_url", "unknown",
+                 "Action", "Adventure", "Animation", "Children's", "Comedy", "Crime", "Documentary",
+                 "Drama", "Fantasy", "Film-Noir", "Horror", "Musical", "Mystery", "Romance",
+                 "Sci-Fi", "Thriller", "War", "Western"]
+
+
+def _file_hash(path):
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _parse_ratings(path):
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    return pd.read_csv(path, sep="\t", names=["user_id", "movie_id", "rating", "timestamp"])
+
+
+def _parse_movies(path):
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    return pd.read_csv(path, sep="|", encoding="latin-1", header=None, names=MOVIE_COLUMNS)
+
+
+def _compact_column(name, values):
+    """Type le plus petit pour chaque colonne : int32 pour les ids, int8 pour les notes et
+    genres, catégories (codes + table des valeurs) pour le texte"""
+    if not pd.api.types.is_numeric_dtype(values):
+        return "categorical", pd.Categorical(values)
+    if pd.api.types.is_integer_dtype(values):
+        if values.min() >= -128 and values.max() <= 127 and name not in ("user_id", "movie_id"):
+            return "array", values.to_numpy(np.int8)
+        return "array", values.to_numpy(np.int32 if values.abs().max() < 2 ** 31 else np.int64)
+    if name == "rating" and (values == values.round()).all() and values.between(-128, 127).all():
+        return "array", values.to_numpy(np.int8)
+    return "array", values.to_numpy(np.float32)
+
+
+def _write_cache(df, cache_dir):
+    """Une colonne = un .npy ; le texte en codes .npy + catégories .npy"""
+    os.makedirs(cache_dir)
+    columns = []
+    for i, name in enumerate(df.columns):
+        kind, values = _compact_column(name, df[name])
+        entry = {"name": name, "kind": kind, "file": f"col{i}.npy"}
+        if kind == "categorical":
+            np.save(os.path.join(cache_dir, entry["file"]), values.codes)
+            entry["categories"] = f"col{i}_categories.npy"
+            np.save(os.path.join(cache_dir, entry["categories"]), values.categories.to_numpy(dtype=str))
+        else:
+            np.save(os.path.join(cache_dir, entry["file"]), values)
+        columns.append(entry)
+    with open(os.path.join(cache_dir, "columns.json"), "w") as f:
+        json.dump(columns, f)
+
+
+def _read_cache(cache_dir, columns=None):
+    """DataFrame dont les colonnes numériques sont des memmap en lecture seule (aucun parsing)"""
+    with open(os.path.join(cache_dir, "columns.json"), "r") as f:
+        entries = json.load(f)
+    if columns is not None:
+        entries = sorted((e for e in entries if e["name"] in columns), key=lambda e: columns.index(e["name"]))
+    data = {}
+    for entry in entries:
+        values = np.load(os.path.join(cache_dir, entry["file"]), mmap_mode="r")
+        if entry["kind"] == "categorical":
+            categories = np.load(os.path.join(cache_dir, entry["categories"]))
+            values = pd.Categorical.from_codes(values, categories=categories)
+        data[entry["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_table(path, parser, columns=None):
+    """Charger `path` depuis son cache binaire, reconstruit si le fichier source a changé.
+
+    Le cache vit dans <dossier>/.npy_cache/<fichier>/<sha1 du contenu>/ ;
+    current.json garde taille, mtime et sha1 de la source. Si taille et mtime
+    n'ont pas bougé, rien n'est relu ; sinon le fichier est haché et le cache
+    n'est reconstruit que si le contenu a vraiment changé. Le nouveau cache
+    est écrit à côté puis désigné par un remplacement atomique de current.json.
+    """
+    source = os.stat(path)
+    base_dir = os.path.join(os.path.dirname(path) or ".", CACHE_DIRNAME, os.path.basename(path))
+    current_path = os.path.join(base_dir, "current.json")
+
+    current = None
+    if os.path.exists(current_path):
+        with open(current_path, "r") as f:
+            current = json.load(f)
+        if current["size"] == source.st_size and current["mtime_ns"] == source.st_mtime_ns:
+            return _read_cache(os.path.join(base_dir, current["sha1"]), columns)
+
+    digest = _file_hash(path)
+    cache_dir = os.path.join(base_dir, digest)
+    if not os.path.exists(os.path.join(cache_dir, "columns.json")):
+        tmp_dir = f"{cache_dir}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        _write_cache(parser(path), tmp_dir)
+        try:
+            os.rename(tmp_dir, cache_dir)
+        except OSError:
+            # Un autre processus l'a construit en même temps
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    tmp_current = f"{current_path}.{os.getpid()}.tmp"
+    with open(tmp_current, "w") as f:
+        json.dump({"size": source.st_size, "mtime_ns": source.st_mtime_ns, "sha1": digest}, f)
+    os.replace(tmp_current, current_path)
+
+    # Les anciennes versions ne servent plus
+    if current is not None and current["sha1"] != digest:
+        shutil.rmtree(os.path.join(base_dir, current["sha1"]), ignore_errors=True)
+    return _read_cache(cache_dir, columns)
+
+
+def load_ratings(path="data/u.data", columns=None):
+    """Notes MovieLens (u.data, ou un .csv avec en-tête comme ratings_clean.csv)"""
+    return load_table(path, _parse_ratings, columns)
+
+
+def load_movies(path="data/u.item", columns=None):
+    """Films MovieLens (u.item, ou un .csv avec en-tête comme movies_clean.csv)"""
+    return load_table(path, _parse_movies, columns)
@@ -0,0 +1,117 @@
+import os
+import numpy as np
+
+USER_IDS_FILE = "user_ids.npy"
+ITEM_IDS_FILE = "item_ids.npy"
+
+
+class IdMap:
+    """Correspondance id brut -> index dense (0..n-1), en ajout seul.
+
+    `ids[i]` est l'id brut de l'index i ; une table de correspondance
+    indexée par l'id brut donne l'index inverse (-1 pour un id inconnu).
+    Un nouvel id reçoit toujours l'index suivant : contrairement à un
+    LabelEncoder réajusté, les index existants ne bougent jamais. Les deux
+    tableaux grandissent par doublement, un ajout coûte donc O(1) amorti.
+    """
+
+    def __init__(self, ids=()):
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) and ids.min() < 0:
+            raise ValueError("Les ids bruts doivent être positifs ou nuls")
+        if len(np.unique(ids)) != len(ids):
+            raise ValueError("Ids bruts en double")
+        self._ids = ids.copy()
+        self._size = len(ids)
+        self._lookup = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype=np.int32)
+        self._lookup[ids] = np.arange(len(ids), dtype=np.int32)
+
+    @classmethod
+    def fit(cls, raw_ids):
+        """Index dans l'ordre trié des ids, comme LabelEncoder.fit"""
+        return cls(np.unique(np.asarray(raw_ids, dtype=np.int64)))
+
+    @classmethod
+    def from_encoder(cls, encoder):
+        """Reprendre un LabelEncoder existant sans changer ses index"""
+        return cls(encoder.classes_)
+
+    @classmethod
+    def from_mapping(cls, id_to_idx):
+        """Reprendre un dict {id brut: index} aux index contigus"""
+        ids = np.zeros(len(id_to_idx), dtype=np.int64)
+        for raw_id, idx in id_to_idx.items():
+            ids[idx] = raw_id
+        return cls(ids)
+
+    @property
+    def ids(self):
+        return self._ids[:self._size]
+
+    def __len__(self):
+        return self._size
+
+    def get(self, raw_id):
+        """Index d'un id brut, -1 s'il est inconnu"""
+        raw_id = int(raw_id)
+        if 0 <= raw_id < len(self._lookup):
+            return int(self._lookup[raw_id])
+        return -1
+
+    def transform(self, raw_ids):
+        """Index de chaque id brut (vectorisé), -1 pour les ids inconnus"""
+        raw_ids = np.asarray(raw_ids, dtype=np.int64)
+        positions = np.full(raw_ids.shape, -1, dtype=np.int32)
+        in_range = (raw_ids >= 0) & (raw_ids < len(self._lookup))
+        positions[in_range] = self._lookup[raw_ids[in_range]]
+        return positions
+
+    def inverse(self, positions):
+        """Ids bruts des index donnés"""
+        return self.ids[np.asarray(positions)]
+
+    def add(self, raw_ids):
+        """Ajouter les ids inconnus (dans leur ordre d'apparition) et rendre l'index de chaque id"""
+        raw_ids = np.asarray(raw_ids, dtype=np.int64)
+        positions = self.transform(raw_ids)
+        unknown = raw_ids[positions < 0]
+        if len(unknown) == 0:
+            return positions
+        if unknown.min() < 0:
+            raise ValueError("Les ids bruts doivent être positifs ou nuls")
+        _, first = np.unique(unknown, return_index=True)
+        new_ids = unknown[np.sort(first)]
+
+        end = self._size + len(new_ids)
+        if end > len(self._ids):
+            self._ids = np.concatenate([self._ids[:self._size],
+                                        np.zeros(max(end, 2 * len(self._ids)) - self._size, dtype=np.int64)])
+        if new_ids.max() >= len(self._lookup):
+            grown = max(int(new_ids.max()) + 1, 2 * len(self._lookup))
+            self._lookup = np.concatenate([self._lookup, np.full(grown - len(self._lookup), -1, dtype=np.int32)])
+        self._ids[self._size:end] = new_ids
+        self._lookup[new_ids] = np.arange(self._size, end, dtype=np.int32)
+        self._size = end
+        return self.transform(raw_ids)
+
+    def save(self, path):
+        np.save(path, self.ids)
+
+    @classmethod
+    def load(cls, path):
+        return cls(np.load(path))
+
+
+def save_model_id_maps(model_dir, user_map, item_map):
+    user_map.save(os.path.join(model_dir, USER_IDS_FILE))
+    item_map.save(os.path.join(model_dir, ITEM_IDS_FILE))
+
+
+def load_model_id_maps(model_dir):
+    """(user_map, item_map) d'un modèle : user_ids.npy / item_ids.npy, sinon ses anciens LabelEncoder"""
+    user_path = os.path.join(model_dir, USER_IDS_FILE)
+    if os.path.exists(user_path):
+        return IdMap.load(user_path), IdMap.load(os.path.join(model_dir, ITEM_IDS_FILE))
+    import joblib
+    return (IdMap.from_encoder(joblib.load(os.path.join(model_dir, "user_encoder.pkl"))),
+            IdMap.from_encoder(joblib.load(os.path.join(model_dir, "item_encoder.pkl"))))
@@ -0,0 +1,228 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from sklearn.preprocessing import normalize
+
+
+SIMILARITY_METRICS = {}
+
+
+def register_metric(name):
+    """Register a kernel class (or factory) under a metric name"""
+    def decorator(kernel_cls):
+        SIMILARITY_METRICS[name] = kernel_cls
+        return kernel_cls
+    return decorator
+
+
+def get_kernel(metric, matrix):
+    """Instantiate the registered kernel for `metric` on `matrix`"""
+    if metric not in SIMILARITY_METRICS:
+        raise ValueError(f"Unknown similarity metric '{metric}', "
+                         f"expected one of {sorted(SIMILARITY_METRICS)}")
+    return SIMILARITY_METRICS[metric](matrix)
+
+
+def _entry_rows(matrix):
+    """Row index of every stored entry of a CSR matrix"""
+    return np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+
+
+def _center(matrix, means, by_row):
+    """Subtract per-row or per-column means from the stored entries only"""
+    centered = matrix.copy()
+    offsets = means[_entry_rows(matrix)] if by_row else means[matrix.indices]
+    centered.data = centered.data - offsets.astype(np.float32)
+    return centered
+
+
+def _stored_means(matrix, axis):
+    """Mean of the stored entries along rows (axis=1) or columns (axis=0)"""
+    counts = matrix.getnnz(axis=axis)
+    sums = np.asarray(matrix.sum(axis=axis), dtype=np.float64).ravel()
+    return np.divide(sums, counts, out=np.zeros(len(counts)), where=counts > 0)
+
+
+class SimilarityKernel:
+    """Similarity between the rows of a sparse matrix, one row block at a time.
+
+    Subclasses turn the ratings into `left`/`right` factors so that a block of
+    scores is a single sparse product. A positive `shrinkage` multiplies each
+    score by n_common / (n_common + shrinkage), where n_common is the number
+    of co-rated columns.
+    """
+
+    def __init__(self, matrix, shrinkage=0):
+        matrix = matrix.tocsr().astype(np.float32)
+        self.shrinkage = shrinkage
+        self.rated = None
+        if shrinkage > 0:
+            self.rated = self._binary(matrix)
+        self.left = self._prepare(matrix)
+        self.right = self.left.T.tocsc()
+
+    @staticmethod
+    def _binary(matrix):
+        rated = matrix.copy()
+        rated.data = np.ones_like(rated.data)
+        return rated
+
+    def _prepare(self, matrix):
+        return normalize(matrix, norm='l2', axis=1).tocsr()
+
+    def _scores(self, start, stop):
+        return (self.left[start:stop] @ self.right).toarray()
+
+    @property
+    def n_rows(self):
+        return self.left.shape[0]
+
+    def block(self, start, stop):
+        """Dense float32 similarities of rows start:stop against every row"""
+        scores = self._scores(start, stop).astype(np.float32, copy=False)
+        if self.rated is not None:
+            common = (self.rated[start:stop] @ self.rated.T).toarray()
+            scores *= common / (common + self.shrinkage)
+        return scores
+
+
+@register_metric('cosine')
+class CosineKernel(SimilarityKernel):
+    """Plain cosine on the raw ratings (missing ratings count as 0)"""
+
+
+@register_metric('pearson')
+class PearsonKernel(SimilarityKernel):
+    """Cosine of ratings centered on each row's own mean (mean-centered Pearson)"""
+
+    def _prepare(self, matrix):
+        centered = _center(matrix, _stored_means(matrix, axis=1), by_row=True)
+        return normalize(centered, norm='l2', axis=1).tocsr()
+
+
+@register_metric('adjusted_cosine')
+class AdjustedCosineKernel(SimilarityKernel):
+    """Cosine of ratings centered on each column's mean.
+
+    On the item-user matrix this subtracts each user's mean, which is the
+    classic adjusted cosine for item-item similarity.
+    """
+
+    def _prepare(self, matrix):
+        centered = _center(matrix, _stored_means(matrix, axis=0), by_row=False)
+        return normalize(centered, norm='l2', axis=1).tocsr()
+
+
+@register_metric('jaccard')
+class JaccardKernel(SimilarityKernel):
+    """|A & B| / |A | B| over the sets of rated columns"""
+
+    def _prepare(self, matrix):
+        binary = self._binary(matrix)
+        self.counts = binary.getnnz(axis=1).astype(np.float32)
+        return binary
+
+    def _scores(self, start, stop):
+        common = (self.left[start:stop] @ self.right).toarray()
+        union = self.counts[start:stop, None] + self.counts[None, :] - common
+        return np.divide(common, union, out=np.zeros_like(common), where=union > 0)
+
+
+register_metric('shrunk_pearson')(partial(PearsonKernel, shrinkage=100))
+register_metric('shrunk_cosine')(partial(CosineKernel, shrinkage=100))
+
+
+def _top_k(block, k):
+    """Column positions and values of the k largest entries of each block row"""
+    part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    values = np.take_along_axis(block, part, axis=1)
+    order = np.argsort(-values, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(values, order, axis=1)
+
+
+def block_size_for(n_rows, max_block_mb=256):
+    """Rows per block so that one dense float32 block stays under max_block_mb"""
+    return max(1, int(max_block_mb * 2**20) // (4 * max(n_rows, 1)))
+
+
+# Kernel shared by the blocks computed in a worker process, set once by _init_worker
+_worker_kernel = None
+
+
+def _init_worker(kernel):
+    global _worker_kernel
+    _worker_kernel = kernel
+
+
+def _top_k_task(task):
+    start, stop, k = task
+    block = _worker_kernel.block(start, stop)
+    block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+    neighbors, scores = _top_k(block, k)
+    return start, neighbors, scores
+
+
+def _memmap_task(task):
+    start, stop, path = task
+    n_rows = _worker_kernel.n_rows
+    out = np.memmap(path, dtype=np.float32, mode='r+', shape=(n_rows, n_rows))
+    out[start:stop] = _worker_kernel.block(start, stop)
+    out.flush()
+    return start
+
+
+def _run(kernel, tasks, func, n_jobs):
+    """Run block tasks in-process or across a pool of n_jobs processes"""
+    if n_jobs is None or n_jobs <= 1:
+        _init_worker(kernel)
+        try:
+            for task in tasks:
+                yield func(task)
+        finally:
+            _init_worker(None)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(kernel,)) as pool:
+            yield from pool.map(func, tasks)
+
+
+def blocked_similarity(matrix, top_k=None, out_path=None, block_size=None,
+                       max_block_mb=256, n_jobs=1, metric='cosine', kernel=None):
+    """Row-by-row similarity of a sparse matrix computed in bounded-memory blocks.
+
+    Each block of `block_size` rows (by default sized from `max_block_mb`) is
+    compared against every row, so peak memory per process is about
+    block_size x n_rows float32 plus the sparse matrix itself. Blocks are
+    spread over `n_jobs` processes. `metric` names a kernel from
+    SIMILARITY_METRICS; a prebuilt `kernel` takes precedence.
+
+    With `top_k`, blocks are reduced as they arrive and `(neighbors, scores)`
+    arrays of shape (n_rows, top_k) are returned, self excluded. Otherwise
+    the full float32 matrix is written to a memory-mapped file at `out_path`
+    and returned as a read-only np.memmap.
+    """
+    if kernel is None:
+        kernel = get_kernel(metric, matrix)
+    n_rows = kernel.n_rows
+    if block_size is None:
+        block_size = block_size_for(n_rows, max_block_mb)
+    bounds = [(start, min(start + block_size, n_rows)) for start in range(0, n_rows, block_size)]
+
+    if top_k is not None:
+        k = max(0, min(top_k, n_rows - 1))
+        neighbors = np.empty((n_rows, k), dtype=np.int32)
+        scores = np.empty((n_rows, k), dtype=np.float32)
+        if k > 0:
+            tasks = [(start, stop, k) for start, stop in bounds]
+            for start, block_neighbors, block_scores in _run(kernel, tasks, _top_k_task, n_jobs):
+                neighbors[start:start + len(block_neighbors)] = block_neighbors
+                scores[start:start + len(block_scores)] = block_scores
+        return neighbors, scores
+
+    if out_path is None:
+        raise ValueError("blocked_similarity needs either top_k or out_path")
+    np.memmap(out_path, dtype=np.float32, mode='w+', shape=(n_rows, n_rows)).flush()
+    tasks = [(start, stop, out_path) for start, stop in bounds]
+    for _ in _run(kernel, tasks, _memmap_task, n_jobs):
+        pass
+    return np.memmap(out_path, dtype=np.float32, mode='r', shape=(n_rows, n_rows))